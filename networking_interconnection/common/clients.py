@@ -12,30 +12,232 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import os
+import threading
+import time
+
 from keystoneauth1.session import Session as KeystoneSession
-from keystoneclient.auth.identity.v3 import Password as PasswordClient
-from keystoneclient.v3.client import Client as KeystoneClient
-from neutronclient.neutron.client import Client as NeutronClient
+from keystoneauth1.session import TCPKeepAliveAdapter
+from neutron_lib.api.definitions import bgpvpn as bgpvpn_def
+from neutron_lib import context as n_context
+from neutron_lib import exceptions as n_exc
+from neutron_lib.plugins import directory
+from neutronclient.common import exceptions as n_client_exc
 from oslo_log import log
+import requests
 
+from networking_interconnection.common import cache
+from networking_interconnection.common import metrics
+from networking_interconnection.common import utils
 from networking_interconnection.extensions import interconnection as intc_exc
 from networking_interconnection import version
 
 LOG = log.getLogger(__name__)
 
 
+# keystoneclient and neutronclient are imported when the first region is
+# used, they take a considerable part of neutron-server start otherwise
+def _password_auth(**kwargs):
+    from keystoneclient.auth.identity import v3
+    return v3.Password(**kwargs)
+
+
+def _keystone_client(**kwargs):
+    from keystoneclient.v3 import client
+    return client.Client(**kwargs)
+
+
+def _neutron_client(**kwargs):
+    from neutronclient.neutron import client
+    return client.Client(**kwargs)
+
+
+class GuardedAdapter(TCPKeepAliveAdapter):
+    """HTTP adapter which sends requests of a region through its breaker.
+
+    Connection errors, timeouts, 5xx responses and any other error raised
+    while sending are failures. While the breaker is open requests fail
+    immediately. The timeout of reads follows the latency of the region,
+    writes keep the configured timeout because they can be much slower
+    than reads and are not safe to repeat.
+
+    on_unauthorized is called when the region rejects a token or the
+    credentials.
+    """
+
+    ADAPTIVE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, breaker, auth_url, on_unauthorized=None, **kwargs):
+        self.breaker = breaker
+        self.auth_url = auth_url
+        self.on_unauthorized = on_unauthorized
+        super(GuardedAdapter, self).__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if not self.breaker.allow():
+            raise intc_exc.RemoteKeystoneUnavailable(
+                remote_keystone=self.auth_url)
+        adaptive = self.breaker.timeout
+        if (adaptive and request.method in self.ADAPTIVE_METHODS and
+                (timeout is None or isinstance(timeout, (int, float)))):
+            timeout = min(timeout or adaptive, adaptive)
+        start = time.monotonic()
+        failed = True
+        try:
+            response = super(GuardedAdapter, self).send(
+                request, timeout=timeout, **kwargs)
+            failed = response.status_code >= 500
+            if response.status_code == 401 and self.on_unauthorized:
+                self.on_unauthorized()
+            return response
+        finally:
+            # a half-open probe must always be finished, otherwise the
+            # breaker stays open
+            if failed:
+                self._failed(request)
+            else:
+                self.breaker.record_success(time.monotonic() - start)
+
+    def _failed(self, request):
+        if self.breaker.record_failure():
+            LOG.warning('Requests to %s failed too many times, region of '
+                        '%s is not called for a while.', request.url,
+                        self.auth_url)
+
+
+class LocalNeutronClient(object):
+    """Neutron client of the local region which calls BGPVPNs in-process.
+
+    The BGPVPN service plugin is loaded in the same Neutron server, so
+    BGPVPNs are read and updated by the plugin with the admin context
+    instead of the local API. Results and errors look like the ones of
+    neutronclient. Other calls are sent by the given HTTP client.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @property
+    def _plugin(self):
+        return directory.get_plugin(bgpvpn_def.ALIAS)
+
+    def show_bgpvpn(self, bgpvpn_id):
+        plugin = self._plugin
+        if plugin is None:
+            return self._client.show_bgpvpn(bgpvpn_id)
+        try:
+            bgpvpn = plugin.get_bgpvpn(
+                n_context.get_admin_context(), bgpvpn_id)
+        except n_exc.NotFound as err:
+            raise n_client_exc.NotFound(message=str(err))
+        return {'bgpvpn': bgpvpn}
+
+    def list_bgpvpns(self, **params):
+        plugin = self._plugin
+        if plugin is None:
+            return self._client.list_bgpvpns(**params)
+        filters = {key: value if isinstance(value, list) else [value]
+                   for key, value in params.items()}
+        return {'bgpvpns': plugin.get_bgpvpns(
+            n_context.get_admin_context(), filters=filters)}
+
+    def update_bgpvpn(self, bgpvpn_id, body=None):
+        plugin = self._plugin
+        if plugin is None:
+            return self._client.update_bgpvpn(bgpvpn_id, body=body)
+        try:
+            bgpvpn = plugin.update_bgpvpn(
+                n_context.get_admin_context(), bgpvpn_id, body)
+        except n_exc.NotFound as err:
+            raise n_client_exc.NotFound(message=str(err))
+        return {'bgpvpn': bgpvpn}
+
+
 class ClientManager(object):
+    """Creates and caches authenticated clients per region.
+
+    Every region gets exactly one keystone session that is shared by its
+    Neutron and Keystone clients. The session keeps the token issued by the
+    password plugin and re-authenticates by itself when the token is about
+    to expire or the remote API answers with 401, so cached clients can be
+    reused for the whole lifetime of the plugin. Clients of a region which
+    answered 401 are dropped anyway, the next call creates new ones.
+
+    HTTP connections of a region are pooled in a dedicated requests session
+    with TCP keep-alive, so established TLS connections to the remote
+    keystone and neutron endpoints survive between calls and even between
+    re-created clients of the same region.
+
+    Every region has a circuit breaker, so a degraded region fails fast
+    instead of blocking API workers for all retries of every call.
+
+    Clients and connections are cached per process. Neutron server forks
+    its workers after the plugin was loaded and possibly warmed up, a
+    forked worker creates its own ones instead of sharing sockets of the
+    parent.
+
+    BGPVPNs of the local region are handled in-process, see
+    LocalNeutronClient.
+    """
 
     def __init__(self, config):
         # Save config
         self.cfg = config
-        # Validate local keystone credentials
-        self._keystone_session(self.cfg.region_name)
+        self._pid = None
+        self._check_pid()
+        # latencies of calls made by the clients
+        self.metrics = metrics.Registry(
+            statsd_host=self.cfg.statsd_host,
+            statsd_port=self.cfg.statsd_port,
+            metrics_dir=self.cfg.metrics_dir,
+            file_interval=self.cfg.metrics_file_interval,
+        )
+        # Validate keystone credentials without delaying the start
+        self.warm_up_thread = None
+        if self.cfg.check_credentials_on_start:
+            self.warm_up_thread = threading.Thread(
+                target=self.warm_up, name='interconnection-warm-up',
+                daemon=True)
+            self.warm_up_thread.start()
+
+    def warm_up(self):
+        """Authenticate in the local and prewarm regions concurrently.
+
+        Wrong credentials are reported early and the first requests to
+        the regions reuse the token and opened connections.
+        """
+        regions = [self.cfg.region_name]
+        regions += [region for region in self.cfg.prewarm_regions
+                    if region not in regions]
+        utils.run_concurrently(
+            len(regions),
+            [(self._check_credentials, region) for region in regions])
+
+    def _check_credentials(self, region):
+        try:
+            _, keystone = self.get_clients(region)
+            keystone.session.get_token()
+        except Exception as err:
+            LOG.error('Could not authenticate in region %s, check '
+                      'credentials of the interconnection plugin. '
+                      'Details: %s', region, err)
+
+    def _check_pid(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._clients = cache.LRUCache(self.cfg.client_cache_size)
+            self._http_sessions = cache.LRUCache(self.cfg.client_cache_size)
+            # the lock could be held by a thread of the parent while forking
+            self._lock = threading.Lock()
 
     def _keystone_session(self, region):
         auth_url = self._get_auth_url(region)
-        session = KeystoneSession(
-            auth=PasswordClient(
+        return KeystoneSession(
+            auth=_password_auth(
                 auth_url=auth_url,
                 username=self.cfg.username,
                 password=self.cfg.password,
@@ -47,31 +249,79 @@ class ClientManager(object):
             connect_retries=self.cfg.keystone_connect_retries,
             app_name='Neutron Interconnection',
             app_version=version.version_info,
+            session=self._http_session(region),
         )
-        if self.cfg.check_credentials_on_start:
-            # Simple check that credentials are correct
-            session.get_token()
-        return session
 
-    def get_clients(self, region):
-        try:
-            session = self._keystone_session(region)
-            neutron = NeutronClient(
-                api_version='2.0',
-                session=session,
-                region_name=region,
-                endpoint_type=self.cfg.endpoint_type,
+    def _http_session(self, region):
+        http = self._http_sessions.get(region)
+        if http is None:
+            http = requests.Session()
+            # keep the keystoneauth adapter to not lose TCP keep-alive
+            breaker = utils.CircuitBreaker(
+                failures=self.cfg.circuit_breaker_failures,
+                reset_timeout=self.cfg.circuit_breaker_reset_timeout,
+                max_timeout=self.cfg.keystone_connect_timeout,
+                min_timeout=self.cfg.adaptive_timeout_min,
+                timeout_factor=self.cfg.adaptive_timeout_factor,
             )
-            keystone = KeystoneClient(
-                session=session,
-                region_name=region,
-                endpoint_type=self.cfg.endpoint_type,
+            adapter = GuardedAdapter(
+                breaker, self._get_auth_url(region),
+                # authenticate with new clients next time
+                on_unauthorized=lambda: self.invalidate(region),
+                pool_connections=self.cfg.http_pool_connections,
+                pool_maxsize=self.cfg.http_pool_maxsize,
+                pool_block=self.cfg.http_pool_block,
             )
-            return neutron, keystone
-        except Exception:
-            LOG.exception('Could not get clients.')
-            raise intc_exc.RemoteKeystoneUnavailable(
-                remote_keystone=self._get_auth_url(region))
+            http.mount('https://', adapter)
+            http.mount('http://', adapter)
+            self._http_sessions.set(region, http)
+        return http
+
+    def _make_clients(self, region):
+        session = self._keystone_session(region)
+        neutron = _neutron_client(
+            api_version='2.0',
+            session=session,
+            region_name=region,
+            endpoint_type=self.cfg.endpoint_type,
+        )
+        keystone = _keystone_client(
+            session=session,
+            region_name=region,
+            endpoint_type=self.cfg.endpoint_type,
+        )
+        neutron = metrics.InstrumentedClient(neutron, region, self.metrics)
+        if (region == self.cfg.region_name and
+                self.cfg.local_bgpvpns_in_process):
+            neutron = LocalNeutronClient(neutron)
+        return (
+            neutron,
+            metrics.InstrumentedClient(keystone, region, self.metrics,
+                                       nested=('projects', 'domains')),
+        )
+
+    def get_clients(self, region):
+        self._check_pid()
+        clients = self._clients.get(region)
+        if clients is not None:
+            return clients
+        with self._lock:
+            # another thread could create clients while we were waiting
+            clients = self._clients.get(region)
+            if clients is None:
+                try:
+                    clients = self._make_clients(region)
+                except Exception:
+                    LOG.exception('Could not get clients.')
+                    raise intc_exc.RemoteKeystoneUnavailable(
+                        remote_keystone=self._get_auth_url(region))
+                self._clients.set(region, clients)
+        return clients
+
+    def invalidate(self, region):
+        """Drop cached clients so the next call authenticates again."""
+        self._check_pid()
+        self._clients.pop(region)
 
     def _get_auth_url(self, region):
         return self.cfg.auth_url_template % {'region': region}
@@ -29,3 +29,18 @@ TYPES = [TYPE_BGPVPN]
 INVTERCONNECTION_RESOURCE = 'interconnection'
 API_RESOURCE_NAME = 'interconnection'
 API_COLLECTION_NAME = 'interconnections'
+API_PATH_SINGLE = '/%s/%s/' % (API_RESOURCE_NAME, API_COLLECTION_NAME)
+API_PATH_COLLECTION = '/%s/%s' % (API_RESOURCE_NAME, API_COLLECTION_NAME)
+# statistics of time interconnections need to become ACTIVE
+API_ACTIVATION_TIME_RESOURCE_NAME = 'activation_time'
+API_ACTIVATION_TIME_COLLECTION_NAME = 'activation_times'
+
+# resource name of BGPVPNs in API callbacks
+BGPVPN_RESOURCE = 'bgpvpn'
+# sync job telling the peer that export targets of its remote resource
+# were changed
+EVENT_EXPORT_TARGETS_CHANGED = 'export_targets_changed'
+
+# Maximum number of IDs filtered by one list request, 40 UUIDs keep the URL
+# far below usual web server limits
+BGPVPN_IDS_PER_REQUEST = 40
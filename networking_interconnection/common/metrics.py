@@ -0,0 +1,245 @@
+# Copyright (c) 2021 Cloudification GmbH.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import atexit
+import bisect
+import functools
+import inspect
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+
+from oslo_context import context as o_context
+from oslo_log import log
+
+LOG = log.getLogger(__name__)
+
+# upper bounds of latency histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# prefix of exported metric names
+PREFIX = 'interconnection_remote_call'
+# metrics file of a process
+FILE_NAME = 'interconnection-%d.prom'
+FILE_RE = re.compile(r'^interconnection-(\d+)\.prom$')
+
+
+class Histogram(object):
+    """Latency histogram with cumulative buckets like Prometheus has."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+
+class Registry(object):
+    """Collects latencies of remote calls per region and operation.
+
+    Each observation is sent to statsd if statsd_host is given. If
+    metrics_dir is given, all histograms are written to a file in
+    Prometheus text format, at most once per file_interval seconds.
+
+    Every process has its own histograms and file, series are labeled by
+    the pid, so files of API and RPC workers don't contain the same
+    series. Files of processes which are not running anymore are removed.
+    """
+
+    def __init__(self, statsd_host=None, statsd_port=8125,
+                 metrics_dir=None, file_interval=10):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._statsd = None
+        if statsd_host:
+            self._statsd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._statsd_address = (statsd_host, statsd_port)
+        self._metrics_dir = metrics_dir
+        self._file_interval = file_interval
+        self._file_written_at = 0
+        self._pid = os.getpid()
+        if metrics_dir:
+            atexit.register(self._remove_file)
+
+    def _check_pid(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            # forked worker doesn't report calls of its parent
+            self._pid = pid
+            self._histograms = {}
+
+    def observe(self, region, operation, seconds, error=False):
+        key = (region, operation)
+        with self._lock:
+            self._check_pid()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds, error)
+        if self._statsd:
+            self._send_statsd(region, operation, seconds, error)
+        if (self._metrics_dir and time.monotonic() - self._file_written_at >=
+                self._file_interval):
+            self.write_file()
+
+    def get(self, region, operation):
+        with self._lock:
+            self._check_pid()
+            return self._histograms.get((region, operation))
+
+    def _send_statsd(self, region, operation, seconds, error):
+        name = '%s.%s.%s' % (PREFIX, region, operation)
+        lines = ['%s:%d|ms' % (name, seconds * 1000)]
+        if error:
+            lines.append('%s.errors:1|c' % name)
+        try:
+            self._statsd.sendto('\n'.join(lines).encode(),
+                                self._statsd_address)
+        except OSError as err:
+            LOG.debug('Could not send metrics to statsd: %s', err)
+
+    def to_prometheus(self):
+        """Render all histograms in Prometheus text format."""
+        with self._lock:
+            self._check_pid()
+            histograms = sorted(self._histograms.items())
+            lines = ['# TYPE %s_seconds histogram' % PREFIX]
+            for (region, operation), histogram in histograms:
+                labels = 'region="%s",operation="%s",pid="%d"' % (
+                    region, operation, self._pid)
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',),
+                                        histogram.counts):
+                    cumulative += count
+                    lines.append('%s_seconds_bucket{%s,le="%s"} %d' % (
+                        PREFIX, labels, bound, cumulative))
+                lines.append('%s_seconds_sum{%s} %f' % (
+                    PREFIX, labels, histogram.sum))
+                lines.append('%s_seconds_count{%s} %d' % (
+                    PREFIX, labels, histogram.count))
+            lines.append('# TYPE %s_errors_total counter' % PREFIX)
+            for (region, operation), histogram in histograms:
+                lines.append(
+                    '%s_errors_total{region="%s",operation="%s",pid="%d"} '
+                    '%d' % (PREFIX, region, operation, self._pid,
+                            histogram.errors))
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self):
+        """Write histograms to metrics_dir for a textfile collector.
+
+        Every process writes its own file, the file is replaced atomically.
+        """
+        self._file_written_at = time.monotonic()
+        path = os.path.join(self._metrics_dir, FILE_NAME % os.getpid())
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._metrics_dir)
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except OSError as err:
+            LOG.warning('Could not write metrics to %s: %s', path, err)
+            return
+        self._remove_stale_files()
+
+    def _remove_stale_files(self):
+        """Remove files of processes which are not running anymore."""
+        try:
+            names = os.listdir(self._metrics_dir)
+        except OSError:
+            return
+        for name in names:
+            match = FILE_RE.match(name)
+            if not match or _is_running(int(match.group(1))):
+                continue
+            try:
+                os.remove(os.path.join(self._metrics_dir, name))
+            except OSError:
+                # another process removed it at the same time
+                pass
+
+    def _remove_file(self):
+        try:
+            os.remove(os.path.join(self._metrics_dir,
+                                   FILE_NAME % os.getpid()))
+        except OSError:
+            pass
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # process of another user
+        return True
+    return True
+
+
+class InstrumentedClient(object):
+    """Proxy of a client which measures every method call.
+
+    Methods of attributes listed in nested (e.g. keystone managers) are
+    measured too, their operation name contains the attribute name.
+    """
+
+    def __init__(self, client, region, registry, nested=(), prefix=''):
+        self._client = client
+        self._region = region
+        self._registry = registry
+        self._nested = nested
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in self._nested:
+            return InstrumentedClient(attr, self._region, self._registry,
+                                      prefix=self._prefix + name + '.')
+        if inspect.ismethod(attr) or inspect.isfunction(attr):
+            return self._measured(attr, self._prefix + name)
+        return attr
+
+    def _measured(self, method, operation):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            start = time.monotonic()
+            error = False
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                seconds = time.monotonic() - start
+                self._registry.observe(self._region, operation, seconds,
+                                       error)
+                context = o_context.get_current()
+                LOG.debug('Remote call %(operation)s to region %(region)s '
+                          'took %(ms).1f ms%(error)s, request %(request_id)s',
+                          {'operation': operation, 'region': self._region,
+                           'ms': seconds * 1000,
+                           'error': ' and failed' if error else '',
+                           'request_id': getattr(context, 'request_id',
+                                                 None)})
+        return call
@@ -13,6 +13,175 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import itertools
+import random
+import threading
+import time
+
+import eventlet
+from oslo_context import context as o_context
+from oslo_log import log
+
+LOG = log.getLogger(__name__)
+
+
+def run_concurrently(pool_size, calls):
+    """Run (func, *args) calls in green threads of a bounded pool.
+
+    Results are returned in the order of calls. All calls are finished
+    before an exception is re-raised, the exception of the earliest failed
+    call wins. Calls see the request context of the caller, so their log
+    lines carry its request ID.
+    """
+    context = o_context.get_current()
+
+    def run(func, *args):
+        if context is not None:
+            context.update_store()
+        return func(*args)
+
+    pool = eventlet.GreenPool(pool_size)
+    threads = [pool.spawn(run, *call) for call in calls]
+    pool.waitall()
+    return [thread.wait() for thread in threads]
+
+
+def backoff(attempt, interval, max_interval):
+    """Exponential delay with jitter before the next attempt.
+
+    The delay doubles with each attempt counted from 1 up to max_interval,
+    a random part of up to half of it spreads retries of many callers.
+    """
+    delay = min(max_interval, interval * 2 ** (attempt - 1))
+    return random.uniform(delay / 2.0, delay)
+
+
+def retry(func, attempts, interval, max_interval, retryable):
+    """Wrap func to call it again on errors for which retryable is True."""
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        for attempt in itertools.count(1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:
+                if attempt >= attempts or not retryable(err):
+                    raise
+                delay = backoff(attempt, interval, max_interval)
+                LOG.debug('Call of %s failed, attempt %s of %s, retrying in '
+                          '%.2f seconds. Details: %s',
+                          getattr(func, '__name__', func),
+                          attempt, attempts, delay, err)
+                time.sleep(delay)
+    return call
+
+
+class RateLimiter(object):
+    """Spreads calls with the same key to at most rate calls per second."""
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate if rate else 0
+        self._next_call = {}
+        self._lock = threading.Lock()
+
+    def wait(self, key):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            call_at = max(now, self._next_call.get(key, now))
+            self._next_call[key] = call_at + self._interval
+        if call_at > now:
+            time.sleep(call_at - now)
+
+
+class CircuitBreaker(object):
+    """Stops calls to a failing remote service and adapts their timeout.
+
+    The breaker opens after failures consecutive failed calls and rejects
+    all calls for reset_timeout seconds. Then one probe call is allowed,
+    the breaker closes if it succeeds and opens again if it fails.
+
+    The timeout of calls is timeout_factor times the average latency of
+    successful calls, but at least min_timeout and at most max_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    # weight of the latest latency in the moving average
+    LATENCY_WEIGHT = 0.2
+
+    def __init__(self, failures, reset_timeout, max_timeout,
+                 min_timeout=None, timeout_factor=None):
+        self._failures = failures
+        self._reset_timeout = reset_timeout
+        self._max_timeout = max_timeout
+        self._min_timeout = min_timeout
+        self._timeout_factor = timeout_factor
+        self._latency = None
+        self._failed = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if (self._probing or time.monotonic() - self._opened_at <
+                self._reset_timeout):
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def timeout(self):
+        if not self._timeout_factor or self._latency is None:
+            return self._max_timeout
+        timeout = max(self._latency * self._timeout_factor,
+                      self._min_timeout or 0)
+        if self._max_timeout:
+            timeout = min(timeout, self._max_timeout)
+        return timeout
+
+    def allow(self):
+        """Check if a call can be made, take the probe if half-open."""
+        with self._lock:
+            state = self.state
+            if state == self.HALF_OPEN:
+                self._probing = True
+            return state != self.OPEN
+
+    def record_success(self, seconds):
+        with self._lock:
+            if self._latency is None:
+                self._latency = seconds
+            else:
+                self._latency += self.LATENCY_WEIGHT * (
+                    seconds - self._latency)
+            self._failed = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failed call, return True if it opened the breaker."""
+        with self._lock:
+            self._failed += 1
+            opens = (self._opened_at is None and self._failures and
+                     self._failed >= self._failures)
+            if self._probing or opens:
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of sorted samples."""
+    index = max(0, int(round(percent / 100.0 * len(samples))) - 1)
+    return samples[index]
+
 
 def filter_resource(resource, filters=None):
     if not filters:
@@ -12,16 +12,22 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import datetime
+import functools
 import json
 import typing
 
+from oslo_db import exception as db_exc
 from oslo_log import log
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import sqlalchemy as sa
 from sqlalchemy.ext.mutable import Mutable
-from sqlalchemy.types import TypeDecorator, VARCHAR
+from sqlalchemy import orm
 from sqlalchemy.orm import exc
+from sqlalchemy.types import TypeDecorator
 
+from neutron_lib.api import attributes
 from neutron_lib.db import api as db_api
 from neutron_lib.db import constants as db_const
 from neutron_lib.db import model_base
@@ -32,22 +38,44 @@ from neutron_lib.db import utils as db_utils
 from networking_interconnection.common import constants
 from networking_interconnection.extensions import interconnection as intc_exc
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 LOG = log.getLogger(__name__)
 
 
+def json_dumps(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value)
+
+
+def json_loads(value: str):
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
 class JSONEncodedDict(TypeDecorator):
-    "Represents an immutable structure as a json-encoded string."
+    """Represents an immutable structure as a json-encoded string.
 
-    impl = VARCHAR
+    The structure is encoded by orjson if it's installed, it is several
+    times faster than the json module.
+    """
+
+    impl = sa.Text
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         if value is not None:
-            value = json.dumps(value)
+            value = json_dumps(value)
         return value
 
     def process_result_value(self, value, dialect):
         if value is not None:
-            value = json.loads(value)
+            value = json_loads(value)
         return value
 
 
@@ -102,32 +130,135 @@ class Interconnection(standard_attr.HasStandardAttributes, model_base.BASEV2,
     local_parameters = sa.Column(JSONEncodedDict, nullable=True)
     remote_parameters = sa.Column(JSONEncodedDict, nullable=True)
 
+    __table_args__ = (
+        sa.UniqueConstraint(
+            'project_id', 'local_resource_id', 'remote_resource_id',
+            name='uniq_interconnections0project_id0local_resource_id0'
+                 'remote_resource_id'),
+        sa.Index('ix_interconnections_state_id', 'state', 'id'),
+        sa.Index('ix_interconnections_remote_region', 'remote_region'),
+        sa.Index('ix_interconnections_local_resource_id',
+                 'local_resource_id'),
+        sa.Index('ix_interconnections_remote_interconnection_id',
+                 'remote_interconnection_id'),
+        model_base.BASEV2.__table_args__,
+    )
+
     # standard attributes support:
     api_collections = [constants.API_COLLECTION_NAME]
     collection_resource_map = {constants.API_COLLECTION_NAME:
                                constants.API_RESOURCE_NAME}
 
 
+class InterconnectionSyncJob(model_base.BASEV2):
+    """Represents a pending synchronization of an interconnection."""
+    __tablename__ = 'interconnection_sync_jobs'
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+    interconnection_id = sa.Column(sa.String(36), nullable=False, index=True)
+    event = sa.Column(sa.String(36), nullable=False)
+    # interconnection as it was when the job was created, it could be
+    # already deleted when the job runs
+    interconnection = sa.Column(JSONEncodedDict, nullable=False)
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    run_at = sa.Column(sa.DateTime, nullable=False, index=True)
+    locked_until = sa.Column(sa.DateTime)
+    last_error = sa.Column(sa.String(255))
+
+
+class InterconnectionRouteTarget(model_base.BASEV2):
+    """Represents a target imported by a local BGPVPN for an interconnection.
+    """
+    __tablename__ = 'interconnection_route_targets'
+
+    interconnection_id = sa.Column(sa.String(36), primary_key=True)
+    target = sa.Column(sa.String(255), primary_key=True)
+    bgpvpn_id = sa.Column(sa.String(36), nullable=False, index=True)
+
+
+class InterconnectionBgpvpnLock(model_base.BASEV2):
+    """Represents the lock of import targets of a local BGPVPN.
+
+    The row is locked while import targets of the BGPVPN and their tracked
+    route targets are read and updated, so workers of all servers change
+    them one after another.
+    """
+    __tablename__ = 'interconnection_bgpvpn_locks'
+
+    bgpvpn_id = sa.Column(sa.String(36), primary_key=True)
+
+
+class InterconnectionReconcileCursor(model_base.BASEV2):
+    """Represents the last interconnection checked by reconciliation.
+
+    Reconcile workers of all servers share it, a restarted worker
+    continues where the last one stopped.
+    """
+    __tablename__ = 'interconnection_reconcile_cursors'
+
+    name = sa.Column(sa.String(36), primary_key=True)
+    last_id = sa.Column(sa.String(36))
+
+
+class InterconnectionStateTransition(model_base.BASEV2):
+    """Represents a change of the state of an interconnection.
+
+    Transitions are kept when the interconnection is deleted, sync workers
+    remove them after state_transitions_retention days.
+    """
+    __tablename__ = 'interconnection_state_transitions'
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+    interconnection_id = sa.Column(sa.String(36), nullable=False, index=True)
+    remote_region = sa.Column(sa.String(255), nullable=False, index=True)
+    old_state = sa.Column(sa.String(36))
+    new_state = sa.Column(sa.String(36), nullable=False)
+    # user who changed the state, background jobs are "system"
+    actor = sa.Column(sa.String(255), nullable=False)
+    created_at = sa.Column(sa.DateTime, nullable=False, index=True)
+    # seconds the interconnection spent in old_state
+    duration = sa.Column(sa.Float)
+
+
+# columns of Interconnection returned by the API
+INTERCONNECTION_FIELDS = (
+    'id',
+    'project_id',
+    'name',
+    'type',
+    'state',
+    'local_resource_id',
+    'remote_resource_id',
+    'remote_region',
+    'remote_interconnection_id',
+    'local_parameters',
+    'remote_parameters',
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_row_converter(columns: tuple) -> typing.Callable:
+    """Get function which converts a row of columns to a resource dict."""
+    def convert(row):
+        return attributes.populate_project_info(dict(zip(columns, row)))
+    return convert
+
+
 class InterconnectionPluginDb(object):
     """Interconnection service plugin database class using SQLAlchemy models.
     """
 
-    @db_api.CONTEXT_READER
+    @staticmethod
+    def _get_columns(fields: typing.Optional[list] = None) -> list:
+        """Get columns which have to be loaded to return fields."""
+        if not fields:
+            return list(INTERCONNECTION_FIELDS)
+        return [f for f in INTERCONNECTION_FIELDS if f in fields]
+
     def _make_dict(self, db_obj: Interconnection,
                    fields: typing.Optional[list] = None):
-        res = {
-            'id': db_obj['id'],
-            'project_id': db_obj['project_id'],
-            'name': db_obj['name'],
-            'type': db_obj['type'],
-            'state': db_obj['state'],
-            'local_resource_id': db_obj['local_resource_id'],
-            'remote_resource_id': db_obj['remote_resource_id'],
-            'remote_region': db_obj['remote_region'],
-            'remote_interconnection_id': db_obj['remote_interconnection_id'],
-            'local_parameters': db_obj['local_parameters'],
-            'remote_parameters': db_obj['remote_parameters'],
-        }
+        res = {column: db_obj[column]
+               for column in self._get_columns(fields)}
 
         return db_utils.resource_fields(res, fields)
 
@@ -148,17 +279,61 @@ class InterconnectionPluginDb(object):
                 remote_parameters=data['remote_parameters'],
             )
             context.session.add(interconnection_db)
+            # bulk create needs to know which interconnection is a duplicate
+            context.session.flush()
+            self._record_transition(context, interconnection_db, None)
 
         return self._make_dict(interconnection_db)
 
     @db_api.CONTEXT_READER
     def get_interconnections(self, context,
                              filters: typing.Optional[dict] = None,
-                             fields: typing.Optional[list] = None):
-        db_objs = model_query.get_collection(
-            context, Interconnection, None,
-            filters=filters, fields=fields)
-        return [self._make_dict(obj, fields=fields) for obj in db_objs]
+                             fields: typing.Optional[list] = None,
+                             sorts: typing.Optional[list] = None,
+                             limit: typing.Optional[int] = None,
+                             marker: typing.Optional[str] = None,
+                             page_reverse: bool = False):
+        marker_obj = db_utils.get_marker_obj(
+            self, context, constants.API_RESOURCE_NAME, limit, marker)
+        query = model_query.get_collection_query(
+            context, Interconnection,
+            filters=filters, sorts=sorts, limit=limit,
+            marker_obj=marker_obj, page_reverse=page_reverse)
+        # select plain rows of requested columns instead of model objects,
+        # ID is selected if none of the fields is a column
+        columns = self._get_columns(fields)
+        query = query.with_entities(
+            *[getattr(Interconnection, column)
+              for column in columns or ['id']])
+        to_dict = _get_row_converter(tuple(columns))
+        items = [to_dict(row) for row in query]
+        if limit and page_reverse:
+            items.reverse()
+        return items
+
+    @db_api.CONTEXT_READER
+    def get_interconnections_batch(self, context, state: str,
+                                   after_id: typing.Optional[str],
+                                   limit: int):
+        """Get interconnections in state ordered by ID after after_id."""
+        query = context.session.query(Interconnection).filter(
+            Interconnection.state == state)
+        if after_id:
+            query = query.filter(Interconnection.id > after_id)
+        query = query.order_by(Interconnection.id).limit(limit)
+        return [self._make_dict(obj) for obj in query]
+
+    @db_api.CONTEXT_READER
+    def get_reconcile_cursor(self, context, name: str) -> typing.Optional[str]:
+        obj = context.session.query(InterconnectionReconcileCursor).filter(
+            InterconnectionReconcileCursor.name == name).first()
+        return obj.last_id if obj else None
+
+    @db_api.CONTEXT_WRITER
+    def set_reconcile_cursor(self, context, name: str,
+                             last_id: typing.Optional[str]):
+        context.session.merge(
+            InterconnectionReconcileCursor(name=name, last_id=last_id))
 
     @db_api.CONTEXT_READER
     def _get_interconnection(self, context, id: str):
@@ -176,8 +351,11 @@ class InterconnectionPluginDb(object):
     @db_api.CONTEXT_WRITER
     def update_interconnection(self, context, id: str, data: dict):
         db_obj = self._get_interconnection(context, id)
+        old_state = db_obj.state
         if data:
             db_obj.update(data)
+        if db_obj.state != old_state:
+            self._record_transition(context, db_obj, old_state)
         return self._make_dict(db_obj)
 
     @db_api.CONTEXT_WRITER
@@ -186,3 +364,244 @@ class InterconnectionPluginDb(object):
         interconnection = self._make_dict(db_obj)
         context.session.delete(db_obj)
         return interconnection
+
+    @db_api.CONTEXT_WRITER
+    def delete_interconnections(self, context, ids: list) -> list:
+        db_objs = context.session.query(Interconnection).filter(
+            Interconnection.id.in_(ids)).all()
+        not_found = set(ids) - {db_obj.id for db_obj in db_objs}
+        if not_found:
+            raise intc_exc.NotFound(id=sorted(not_found)[0])
+        interconnections = []
+        for db_obj in db_objs:
+            interconnections.append(self._make_dict(db_obj))
+            context.session.delete(db_obj)
+        return interconnections
+
+    def _record_transition(self, context, db_obj: Interconnection,
+                           old_state: typing.Optional[str]):
+        now = timeutils.utcnow()
+        duration = None
+        if old_state:
+            last = context.session.query(
+                InterconnectionStateTransition.created_at,
+            ).filter(
+                InterconnectionStateTransition.interconnection_id ==
+                db_obj.id,
+            ).order_by(InterconnectionStateTransition.id.desc()).first()
+            if last:
+                duration = (now - last.created_at).total_seconds()
+        context.session.add(InterconnectionStateTransition(
+            interconnection_id=db_obj.id,
+            remote_region=db_obj.remote_region,
+            old_state=old_state,
+            new_state=db_obj.state,
+            actor=context.user_id or 'system',
+            created_at=now,
+            duration=duration,
+        ))
+
+    @db_api.CONTEXT_READER
+    def get_state_transitions(self, context, interconnection_id: str) -> list:
+        query = context.session.query(InterconnectionStateTransition).filter(
+            InterconnectionStateTransition.interconnection_id ==
+            interconnection_id,
+        ).order_by(InterconnectionStateTransition.id)
+        return [{
+            'old_state': obj.old_state,
+            'new_state': obj.new_state,
+            'actor': obj.actor,
+            'created_at': obj.created_at,
+            'duration': obj.duration,
+        } for obj in query]
+
+    @db_api.CONTEXT_READER
+    def get_activation_times(self, context,
+                             remote_regions: typing.Optional[list] = None,
+                             limit: typing.Optional[int] = None,
+                             marker: typing.Optional[str] = None,
+                             page_reverse: bool = False) -> dict:
+        """Get seconds interconnections needed to become ACTIVE per region.
+
+        Time is measured from the first transition to VALIDATING or
+        VALIDATED, so time waiting for the remote interconnection to be
+        created isn't counted. Regions are paginated by name.
+        """
+        transition = InterconnectionStateTransition
+        regions = context.session.query(transition.remote_region).filter(
+            transition.new_state == constants.STATE_ACTIVE).distinct()
+        if remote_regions:
+            regions = regions.filter(
+                transition.remote_region.in_(remote_regions))
+        if marker:
+            regions = regions.filter(
+                transition.remote_region < marker if page_reverse
+                else transition.remote_region > marker)
+        regions = regions.order_by(
+            transition.remote_region.desc() if page_reverse
+            else transition.remote_region)
+        if limit:
+            regions = regions.limit(limit)
+        regions = [region for region, in regions]
+        if not regions:
+            return {}
+        # first validation and activation of each interconnection
+        query = context.session.query(
+            transition.remote_region,
+            sa.func.min(sa.case(
+                (transition.new_state != constants.STATE_ACTIVE,
+                 transition.created_at))),
+            sa.func.min(sa.case(
+                (transition.new_state == constants.STATE_ACTIVE,
+                 transition.created_at))),
+        ).filter(
+            transition.remote_region.in_(regions),
+            transition.new_state.in_(
+                [constants.STATE_VALIDATING, constants.STATE_VALIDATED,
+                 constants.STATE_ACTIVE]),
+        ).group_by(transition.interconnection_id, transition.remote_region)
+        times = {}
+        for region, validating, active in query:
+            if validating is None or active is None or active < validating:
+                continue
+            times.setdefault(region, []).append(
+                (active - validating).total_seconds())
+        return times
+
+    @db_api.CONTEXT_WRITER
+    def delete_state_transitions(self, context,
+                                 before: datetime.datetime) -> int:
+        """Delete transitions older than before, return their number."""
+        return context.session.query(InterconnectionStateTransition).filter(
+            InterconnectionStateTransition.created_at < before,
+        ).delete(synchronize_session=False)
+
+    def _make_sync_job_dict(self, db_obj: InterconnectionSyncJob):
+        return {
+            'id': db_obj['id'],
+            'interconnection_id': db_obj['interconnection_id'],
+            'event': db_obj['event'],
+            'interconnection': dict(db_obj['interconnection']),
+            'attempts': db_obj['attempts'],
+        }
+
+    @db_api.CONTEXT_WRITER
+    def create_sync_job(self, context, event: str,
+                        interconnection: dict) -> dict:
+        job_db = InterconnectionSyncJob(
+            interconnection_id=interconnection['id'],
+            event=event,
+            interconnection=interconnection,
+            attempts=0,
+            run_at=timeutils.utcnow(),
+        )
+        context.session.add(job_db)
+        context.session.flush()
+        return self._make_sync_job_dict(job_db)
+
+    @db_api.CONTEXT_READER
+    def get_sync_jobs(self, context, limit: typing.Optional[int] = None):
+        """Get jobs which are due and not taken by any worker.
+
+        Jobs of an interconnection are executed in the order they were
+        created, a job waits until earlier jobs of its interconnection
+        are done.
+        """
+        now = timeutils.utcnow()
+        earlier = orm.aliased(InterconnectionSyncJob)
+        query = context.session.query(InterconnectionSyncJob).filter(
+            InterconnectionSyncJob.run_at <= now,
+            sa.or_(InterconnectionSyncJob.locked_until.is_(None),
+                   InterconnectionSyncJob.locked_until < now),
+            ~sa.exists().where(sa.and_(
+                earlier.interconnection_id ==
+                InterconnectionSyncJob.interconnection_id,
+                earlier.id < InterconnectionSyncJob.id)),
+        ).order_by(InterconnectionSyncJob.id)
+        if limit:
+            query = query.limit(limit)
+        return [self._make_sync_job_dict(obj) for obj in query]
+
+    @db_api.CONTEXT_WRITER
+    def claim_sync_job(self, context, id: int, timeout: int) -> bool:
+        """Lock the job for timeout seconds, return False if it's taken."""
+        now = timeutils.utcnow()
+        count = context.session.query(InterconnectionSyncJob).filter(
+            InterconnectionSyncJob.id == id,
+            sa.or_(InterconnectionSyncJob.locked_until.is_(None),
+                   InterconnectionSyncJob.locked_until < now),
+        ).update(
+            {'locked_until': now + datetime.timedelta(seconds=timeout)},
+            synchronize_session=False)
+        return count == 1
+
+    @db_api.CONTEXT_WRITER
+    def reschedule_sync_job(self, context, id: int, attempts: int,
+                            delay: float, error: str):
+        context.session.query(InterconnectionSyncJob).filter(
+            InterconnectionSyncJob.id == id,
+        ).update({
+            'attempts': attempts,
+            'run_at': timeutils.utcnow() + datetime.timedelta(seconds=delay),
+            'locked_until': None,
+            'last_error': error[:255],
+        }, synchronize_session=False)
+
+    @db_api.CONTEXT_WRITER
+    def delete_sync_job(self, context, id: int):
+        context.session.query(InterconnectionSyncJob).filter(
+            InterconnectionSyncJob.id == id,
+        ).delete(synchronize_session=False)
+
+    @db_api.CONTEXT_READER
+    def get_route_targets(self, context, bgpvpn_id: str) -> dict:
+        """Get targets of a local BGPVPN grouped by interconnection ID."""
+        targets = {}
+        query = context.session.query(InterconnectionRouteTarget).filter(
+            InterconnectionRouteTarget.bgpvpn_id == bgpvpn_id)
+        for obj in query:
+            targets.setdefault(obj.interconnection_id, set()).add(obj.target)
+        return targets
+
+    @db_api.CONTEXT_WRITER
+    def set_route_targets(self, context, interconnection_id: str,
+                          bgpvpn_id: str, targets: list):
+        self.delete_route_targets(context, interconnection_id)
+        for target in set(targets):
+            context.session.add(InterconnectionRouteTarget(
+                interconnection_id=interconnection_id,
+                target=target,
+                bgpvpn_id=bgpvpn_id,
+            ))
+
+    def create_bgpvpn_lock(self, context, bgpvpn_id: str):
+        """Create the lock of a BGPVPN if it doesn't exist yet.
+
+        It must not be called in a transaction, a lock created concurrently
+        fails it.
+        """
+        try:
+            with db_api.CONTEXT_WRITER.using(context):
+                if context.session.get(InterconnectionBgpvpnLock,
+                                       bgpvpn_id) is None:
+                    context.session.add(
+                        InterconnectionBgpvpnLock(bgpvpn_id=bgpvpn_id))
+        except db_exc.DBDuplicateEntry:
+            pass
+
+    def lock_bgpvpn(self, context, bgpvpn_id: str):
+        """Lock a BGPVPN until the transaction of the context ends.
+
+        Waits until transactions of other workers holding the lock end,
+        see create_bgpvpn_lock.
+        """
+        context.session.query(InterconnectionBgpvpnLock).filter(
+            InterconnectionBgpvpnLock.bgpvpn_id == bgpvpn_id,
+        ).with_for_update().one()
+
+    @db_api.CONTEXT_WRITER
+    def delete_route_targets(self, context, interconnection_id: str):
+        context.session.query(InterconnectionRouteTarget).filter(
+            InterconnectionRouteTarget.interconnection_id ==
+            interconnection_id,
+        ).delete(synchronize_session=False)
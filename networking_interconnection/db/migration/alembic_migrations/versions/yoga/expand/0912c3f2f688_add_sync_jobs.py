@@ -0,0 +1,51 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add sync jobs
+
+Revision ID: 0912c3f2f688
+Revises: 3d2b7a795fec
+Create Date: 2022-05-16 10:12:31.408113
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0912c3f2f688'
+down_revision = '3d2b7a795fec'
+
+
+def upgrade():
+    op.create_table(
+        'interconnection_sync_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('interconnection_id', sa.String(length=36),
+                  nullable=False),
+        sa.Column('event', sa.String(length=36), nullable=False),
+        sa.Column('interconnection', sa.Text(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_interconnection_sync_jobs_interconnection_id'),
+        'interconnection_sync_jobs', ['interconnection_id'], unique=False)
+    op.create_index(
+        op.f('ix_interconnection_sync_jobs_run_at'),
+        'interconnection_sync_jobs', ['run_at'], unique=False)
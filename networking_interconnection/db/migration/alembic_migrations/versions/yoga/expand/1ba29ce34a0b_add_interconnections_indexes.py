@@ -0,0 +1,44 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add interconnections indexes
+
+Revision ID: 1ba29ce34a0b
+Revises: f7bc34023fe2
+Create Date: 2022-06-02 09:27:53.840119
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '1ba29ce34a0b'
+down_revision = 'f7bc34023fe2'
+
+TABLE = 'interconnections'
+
+
+def upgrade():
+    # duplicate check of create_interconnection
+    op.create_unique_constraint(
+        constraint_name='uniq_%s0project_id0local_resource_id0'
+                        'remote_resource_id' % TABLE,
+        table_name=TABLE,
+        columns=['project_id', 'local_resource_id', 'remote_resource_id'])
+    # list filters and batches of ACTIVE interconnections
+    op.create_index('ix_%s_state_id' % TABLE, TABLE, ['state', 'id'])
+    op.create_index('ix_%s_remote_region' % TABLE, TABLE, ['remote_region'])
+    op.create_index('ix_%s_remote_interconnection_id' % TABLE, TABLE,
+                    ['remote_interconnection_id'])
@@ -0,0 +1,36 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add local_resource_id index
+
+Revision ID: 2e8d7c5a91f4
+Revises: 6c1f2b9a4d37
+Create Date: 2022-06-20 10:31:44.902517
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2e8d7c5a91f4'
+down_revision = '6c1f2b9a4d37'
+
+TABLE = 'interconnections'
+
+
+def upgrade():
+    # interconnections of a BGPVPN whose export targets were changed
+    op.create_index('ix_%s_local_resource_id' % TABLE, TABLE,
+                    ['local_resource_id'])
@@ -0,0 +1,38 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""widen interconnection parameters
+
+Revision ID: 4b7e2d9c0a16
+Revises: c3b5d8e1f047
+Create Date: 2022-07-05 10:12:44.903215
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2d9c0a16'
+down_revision = 'c3b5d8e1f047'
+
+
+def upgrade():
+    # parameters are not limited to 500 characters anymore
+    for column in ('local_parameters', 'remote_parameters'):
+        op.alter_column('interconnections', column,
+                        type_=sa.Text(),
+                        existing_type=sa.Unicode(length=500),
+                        existing_nullable=True)
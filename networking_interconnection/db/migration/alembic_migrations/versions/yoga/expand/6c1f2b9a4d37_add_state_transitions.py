@@ -0,0 +1,53 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add state transitions
+
+Revision ID: 6c1f2b9a4d37
+Revises: 1ba29ce34a0b
+Create Date: 2022-06-13 11:48:05.216734
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6c1f2b9a4d37'
+down_revision = '1ba29ce34a0b'
+
+
+def upgrade():
+    op.create_table(
+        'interconnection_state_transitions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('interconnection_id', sa.String(length=36),
+                  nullable=False),
+        sa.Column('remote_region', sa.String(length=255), nullable=False),
+        sa.Column('old_state', sa.String(length=36), nullable=True),
+        sa.Column('new_state', sa.String(length=36), nullable=False),
+        sa.Column('actor', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_interconnection_state_transitions_interconnection_id'),
+        'interconnection_state_transitions', ['interconnection_id'],
+        unique=False)
+    op.create_index(
+        op.f('ix_interconnection_state_transitions_remote_region'),
+        'interconnection_state_transitions', ['remote_region'],
+        unique=False)
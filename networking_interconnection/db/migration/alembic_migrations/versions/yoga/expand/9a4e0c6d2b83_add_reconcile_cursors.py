@@ -0,0 +1,38 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add reconcile cursors
+
+Revision ID: 9a4e0c6d2b83
+Revises: 2e8d7c5a91f4
+Create Date: 2022-06-27 09:12:35.407161
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9a4e0c6d2b83'
+down_revision = '2e8d7c5a91f4'
+
+
+def upgrade():
+    op.create_table(
+        'interconnection_reconcile_cursors',
+        sa.Column('name', sa.String(length=36), nullable=False),
+        sa.Column('last_id', sa.String(length=36), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
@@ -0,0 +1,35 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add state transitions created_at index
+
+Revision ID: c3b5d8e1f047
+Revises: 9a4e0c6d2b83
+Create Date: 2022-06-28 15:47:02.318740
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3b5d8e1f047'
+down_revision = '9a4e0c6d2b83'
+
+
+def upgrade():
+    # old transitions are deleted by their age
+    op.create_index(
+        op.f('ix_interconnection_state_transitions_created_at'),
+        'interconnection_state_transitions', ['created_at'], unique=False)
@@ -0,0 +1,37 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add bgpvpn locks
+
+Revision ID: e5a1c7b3d902
+Revises: 4b7e2d9c0a16
+Create Date: 2022-07-06 14:03:27.581930
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c7b3d902'
+down_revision = '4b7e2d9c0a16'
+
+
+def upgrade():
+    op.create_table(
+        'interconnection_bgpvpn_locks',
+        sa.Column('bgpvpn_id', sa.String(length=36), nullable=False),
+        sa.PrimaryKeyConstraint('bgpvpn_id'),
+    )
@@ -0,0 +1,43 @@
+# Copyright (c) 2021 Cloudification GmbH.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add route targets
+
+Revision ID: f7bc34023fe2
+Revises: 0912c3f2f688
+Create Date: 2022-05-23 14:41:07.215376
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7bc34023fe2'
+down_revision = '0912c3f2f688'
+
+
+def upgrade():
+    op.create_table(
+        'interconnection_route_targets',
+        sa.Column('interconnection_id', sa.String(length=36),
+                  nullable=False),
+        sa.Column('target', sa.String(length=255), nullable=False),
+        sa.Column('bgpvpn_id', sa.String(length=36), nullable=False),
+        sa.PrimaryKeyConstraint('interconnection_id', 'target'),
+    )
+    op.create_index(
+        op.f('ix_interconnection_route_targets_bgpvpn_id'),
+        'interconnection_route_targets', ['bgpvpn_id'], unique=False)
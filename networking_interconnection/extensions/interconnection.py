@@ -36,6 +36,11 @@ class NotFound(n_exc.NotFound):
     message = _("Interconnection %(id)s could not be found")
 
 
+class ActivationTimeNotFound(n_exc.NotFound):
+    message = _("No activated interconnections with remote region "
+                "%(remote_region)s found")
+
+
 class ResourceNotFound(n_exc.BadRequest):
     message = _("Resource %(resource_type)s with ID "
                 "%(remote_resource_id)s not found.")
@@ -93,6 +98,7 @@ RESOURCE_ATTRIBUTE_MAP = {
         'id': {'allow_post': False, 'allow_put': False,
                'validate': {'type:uuid': None},
                'is_visible': True,
+               'is_sort_key': True,
                'primary_key': True,
                'enforce_policy': True},
         # policy supports only legacy tenant_id field
@@ -105,36 +111,43 @@ RESOURCE_ATTRIBUTE_MAP = {
         'name': {'allow_post': True, 'allow_put': True,
                  'default': '',
                  'validate': {'type:string': db_const.NAME_FIELD_SIZE},
+                 'is_sort_key': True,
                  'is_visible': True},
         'type': {'allow_post': True, 'allow_put': False,
                  'default': constants.TYPE_BGPVPN,
                  'validate': {'type:values': constants.TYPES},
+                 'is_sort_key': True,
                  'is_visible': True},
         'state': {'allow_post': False, 'allow_put': True,
                   'default': constants.STATE_WAITING,
                   'validate': {'type:values': constants.STATES},
                   'is_filter': True,
+                  'is_sort_key': True,
                   'is_visible': True,
                   'enforce_policy': True},
         'local_resource_id': {'allow_post': True, 'allow_put': False,
                               'validate': {'type:uuid': None},
                               'is_filter': True,
+                              'is_sort_key': True,
                               'is_visible': True,
                               'enforce_policy': True},
         'remote_resource_id': {'allow_post': True, 'allow_put': False,
                                'validate': {'type:uuid': None},
                                'is_filter': True,
+                               'is_sort_key': True,
                                'is_visible': True,
                                'enforce_policy': True},
         'remote_region': {'allow_post': True, 'allow_put': False,
                           'validate': {'type:not_empty_string': 255},
                           'is_filter': True,
+                          'is_sort_key': True,
                           'is_visible': True,
                           'enforce_policy': True},
         'remote_interconnection_id': {'allow_post': True, 'allow_put': True,
                                       'default': None,
                                       'validate': {'type:uuid_or_none': None},
                                       'is_filter': True,
+                                      'is_sort_key': True,
                                       'is_visible': True,
                                       'enforce_policy': True},
         'local_parameters': {'allow_post': False, 'allow_put': False,
@@ -143,7 +156,21 @@ RESOURCE_ATTRIBUTE_MAP = {
         'remote_parameters': {'allow_post': False, 'allow_put': False,
                               'validate': {'type:dict': None},
                               'is_visible': True},
-    }
+    },
+    # time interconnections needed to become ACTIVE per remote region,
+    # measured from the moment they entered VALIDATING
+    constants.API_ACTIVATION_TIME_COLLECTION_NAME: {
+        'remote_region': {'allow_post': False, 'allow_put': False,
+                          'is_filter': True,
+                          'is_visible': True,
+                          'primary_key': True},
+        'count': {'allow_post': False, 'allow_put': False,
+                  'is_visible': True},
+        'p50': {'allow_post': False, 'allow_put': False,
+                'is_visible': True},
+        'p95': {'allow_post': False, 'allow_put': False,
+                'is_visible': True},
+    },
 }
 
 
@@ -175,6 +202,7 @@ class Interconnection(api_extensions.ExtensionDescriptor):
             plural_mappings,
             RESOURCE_ATTRIBUTE_MAP,
             ALIAS,
+            allow_bulk=True,
             # register_quota=True,
             # translate_name=True,
         )
@@ -210,7 +238,9 @@ class InterconnectionPluginBase(libbase.ServicePluginBase):
         pass
 
     @abc.abstractmethod
-    def get_interconnections(self, context, filters=None, fields=None):
+    def get_interconnections(self, context, filters=None, fields=None,
+                             sorts=None, limit=None, marker=None,
+                             page_reverse=False):
         pass
 
     @abc.abstractmethod
@@ -224,3 +254,13 @@ class InterconnectionPluginBase(libbase.ServicePluginBase):
     @abc.abstractmethod
     def delete_interconnection(self, context, id):
         pass
+
+    @abc.abstractmethod
+    def get_activation_times(self, context, filters=None, fields=None,
+                             sorts=None, limit=None, marker=None,
+                             page_reverse=False):
+        pass
+
+    @abc.abstractmethod
+    def get_activation_time(self, context, id, fields=None):
+        pass
@@ -20,17 +20,17 @@ from osc_lib.command import command
 from osc_lib import exceptions
 from osc_lib import utils as osc_utils
 from osc_lib.utils import columns as column_util
+from oslo_utils import uuidutils
 
 from neutronclient._i18n import _
+from neutronclient.common import exceptions as n_exc
 from neutronclient.osc import utils as nc_osc_utils
 
 from networking_interconnection.common import constants
 
 LOG = logging.getLogger(__name__)
-PATH_SINGLE = '/%s/%s/' % (constants.API_RESOURCE_NAME,
-                           constants.API_COLLECTION_NAME)
-PATH_COLLECTION = '/%s/%s' % (constants.API_RESOURCE_NAME,
-                              constants.API_COLLECTION_NAME)
+PATH_SINGLE = constants.API_PATH_SINGLE
+PATH_COLLECTION = constants.API_PATH_COLLECTION
 
 _attr_map = (
     ('id', 'ID', column_util.LIST_BOTH),
@@ -197,9 +197,7 @@ class DeleteInterconnection(command.Command):
         fails = 0
         for id_or_name in parsed_args.interconnections:
             try:
-                id = client.find_resource(constants.API_RESOURCE_NAME,
-                                          id_or_name)['id']
-                client.delete(PATH_SINGLE + id)
+                id = self._delete(client, id_or_name)
                 LOG.warning("Interconnection %(id)s deleted", {'id': id})
             except Exception as e:
                 fails += 1
@@ -213,6 +211,20 @@ class DeleteInterconnection(command.Command):
                       'total': len(parsed_args.interconnections)})
             raise exceptions.CommandError(msg)
 
+    def _delete(self, client, id_or_name):
+        # IDs don't need a lookup, names which look like IDs are resolved
+        # if there is no interconnection with such ID
+        if uuidutils.is_uuid_like(id_or_name):
+            try:
+                client.delete(PATH_SINGLE + id_or_name)
+                return id_or_name
+            except n_exc.NotFound:
+                pass
+        id = client.find_resource(constants.API_RESOURCE_NAME,
+                                  id_or_name)['id']
+        client.delete(PATH_SINGLE + id)
+        return id
+
     def _list(self, retrieve_all=True, **_params):
         client = self.app.client_manager.neutronclient
         return client.list(constants.API_COLLECTION_NAME, PATH_COLLECTION,
@@ -59,14 +59,201 @@ INTERCONNECTION_CONFIG_OPTS = [
     cfg.FloatOpt('keystone_connect_timeout',
                  default=10,
                  help='Keystone request timeout in seconds.'),
+    cfg.IntOpt('circuit_breaker_failures',
+               default=5,
+               min=0,
+               help='Number of consecutive failed requests to a region '
+                    'after which requests to the region fail immediately. '
+                    '0 disables the circuit breaker.'),
+    cfg.FloatOpt('circuit_breaker_reset_timeout',
+                 default=30,
+                 min=0,
+                 help='Seconds requests to a failed region fail immediately '
+                      'before one request probes if the region is back.'),
+    cfg.FloatOpt('adaptive_timeout_factor',
+                 default=10,
+                 min=0,
+                 help='Timeout of read requests to a region is this '
+                      'multiple of the average latency of the region, but at '
+                      'most keystone_connect_timeout. Write requests always '
+                      'use keystone_connect_timeout. 0 disables adaptive '
+                      'timeouts.'),
+    cfg.FloatOpt('adaptive_timeout_min',
+                 default=2,
+                 min=0,
+                 help='Minimal adaptive timeout of requests in seconds.'),
+    cfg.BoolOpt('local_bgpvpns_in_process',
+                default=True,
+                help='Read and update BGPVPNs of the local region by the '
+                     'BGPVPN service plugin loaded in Neutron server instead '
+                     'of calling the local Neutron API.'),
+    cfg.IntOpt('client_cache_size',
+               default=32,
+               min=1,
+               help='Maximum number of regions whose authenticated keystone '
+                    'sessions and API clients are kept in memory.'),
+    cfg.IntOpt('http_pool_connections',
+               default=4,
+               min=1,
+               help='Number of remote hosts per region (keystone, neutron, '
+                    'etc.) to keep HTTP connection pools for.'),
+    cfg.IntOpt('http_pool_maxsize',
+               default=10,
+               min=1,
+               help='Maximum number of keep-alive HTTP connections saved in '
+                    'the pool of a single remote host.'),
+    cfg.BoolOpt('http_pool_block',
+                default=False,
+                help='If True, requests to a remote host wait for a free '
+                     'pooled connection instead of opening an extra one '
+                     'that is discarded afterwards.'),
+    cfg.IntOpt('domain_cache_size',
+               default=1024,
+               min=1,
+               help='Maximum number of project domain names cached per '
+                    'neutron server process.'),
+    cfg.IntOpt('domain_cache_ttl',
+               default=3600,
+               min=0,
+               help='Time in seconds a domain name of a project is cached '
+                    'for. 0 disables caching.'),
+    cfg.IntOpt('bgpvpn_cache_size',
+               default=1000,
+               min=1,
+               help='Maximum number of recently fetched BGPVPNs kept in '
+                    'memory.'),
+    cfg.IntOpt('bgpvpn_cache_ttl',
+               default=10,
+               min=0,
+               help='Time in seconds a fetched BGPVPN is reused by validation '
+                    'and synchronization instead of fetching it again. 0 '
+                    'disables caching. Import targets are always updated '
+                    'based on a fresh BGPVPN.'),
+    cfg.IntOpt('validation_concurrency',
+               default=4,
+               min=1,
+               help='Maximum number of concurrent calls to local and remote '
+                    'APIs while a new interconnection is validated.'),
+    cfg.IntOpt('bulk_validation_concurrency',
+               default=8,
+               min=1,
+               help='Maximum number of interconnections of a bulk create '
+                    'request validated at the same time.'),
+    cfg.IntOpt('sync_workers',
+               default=1,
+               min=0,
+               help='Number of worker processes synchronizing interconnections'
+                    ' and BGPVPNs in background. If 0, synchronization is '
+                    'executed inside API requests and never retried.'),
+    cfg.IntOpt('sync_interval',
+               default=2,
+               min=1,
+               help='Interval in seconds between checks of sync workers for '
+                    'pending synchronization jobs.'),
+    cfg.IntOpt('sync_batch_size',
+               default=50,
+               min=1,
+               help='Maximum number of synchronization jobs taken by a sync '
+                    'worker at once.'),
+    cfg.IntOpt('sync_max_attempts',
+               default=5,
+               min=1,
+               help='Number of attempts to execute a synchronization job '
+                    'before the interconnection is set to TEARDOWN.'),
+    cfg.IntOpt('sync_retry_interval',
+               default=10,
+               min=0,
+               help='Delay in seconds before a failed synchronization job is '
+                    'executed again the first time. A random part of up to '
+                    'half of the delay is subtracted to spread retries.'),
+    cfg.IntOpt('sync_retry_max_interval',
+               default=300,
+               min=0,
+               help='Maximal delay in seconds before a failed synchronization '
+                    'job is executed again. The delay starts at '
+                    'sync_retry_interval and doubles with each attempt.'),
+    cfg.IntOpt('sync_call_attempts',
+               default=3,
+               min=1,
+               help='Number of attempts of a single call to a Neutron API '
+                    'during synchronization if the call failed with one of '
+                    'retryable_status_codes.'),
+    cfg.FloatOpt('sync_call_retry_interval',
+                 default=0.5,
+                 min=0,
+                 help='Delay in seconds before the first retry of a failed '
+                      'call, it doubles with each further retry.'),
+    cfg.FloatOpt('sync_call_retry_max_interval',
+                 default=5,
+                 min=0,
+                 help='Maximal delay in seconds between retries of a failed '
+                      'call.'),
+    cfg.ListOpt('retryable_status_codes',
+                item_type=cfg.types.Integer(),
+                default=[409, 500, 502, 503, 504],
+                help='HTTP status codes of Neutron API responses after which '
+                     'calls are retried. Other 4xx codes fail '
+                     'synchronization jobs without further attempts.'),
+    cfg.IntOpt('sync_job_timeout',
+               default=300,
+               min=1,
+               help='Time in seconds a sync worker keeps a synchronization '
+                    'job locked. If the worker dies, another one takes the '
+                    'job after this time.'),
+    cfg.IntOpt('state_transitions_retention',
+               default=90,
+               min=0,
+               help='Days state transitions of interconnections are kept '
+                    'for statistics of time-to-ACTIVE. Sync workers remove '
+                    'older ones. 0 keeps them forever.'),
+    cfg.IntOpt('reconcile_interval',
+               default=600,
+               min=0,
+               help='Interval in seconds between reconciliations of import '
+                    'targets of ACTIVE interconnections. Each run checks '
+                    'the next reconcile_batch_size interconnections. 0 '
+                    'disables reconciliation.'),
+    cfg.IntOpt('reconcile_batch_size',
+               default=100,
+               min=1,
+               help='Number of interconnections checked by one '
+                    'reconciliation run.'),
+    cfg.FloatOpt('reconcile_region_rate',
+                 default=2,
+                 min=0,
+                 help='Maximum number of API calls per second reconciliation '
+                      'sends to a single region. 0 means no limit.'),
+    cfg.HostAddressOpt('statsd_host',
+                       help='Host of statsd server latencies of remote calls '
+                            'are sent to. Metrics are not sent if not set.'),
+    cfg.PortOpt('statsd_port',
+                default=8125,
+                help='Port of statsd server.'),
+    cfg.StrOpt('metrics_dir',
+               help='Directory where every process writes latencies of '
+                    'remote calls in Prometheus text format, e.g. for a '
+                    'textfile collector. Series are labeled by pid, files '
+                    'of stopped processes are removed. Metrics are not '
+                    'written if not set.'),
+    cfg.IntOpt('metrics_file_interval',
+               default=10,
+               min=1,
+               help='Minimal number of seconds between writes of a metrics '
+                    'file.'),
     cfg.BoolOpt('allow_regions_coincidence',
                 default=False,
                 help='Allow coincidence of interconnctions\' regions.'),
     cfg.BoolOpt('check_credentials_on_start',
                 default=False,
-                help='If True Neutron server will try to get keystone token for'
-                     ' interconnection plugin on start and raise exceptions if'
-                     ' it\'s not working.')
+                help='If True Neutron server will try to get keystone tokens '
+                     'for interconnection plugin in the local region and '
+                     'prewarm_regions in background on start and log errors '
+                     'if it\'s not working.'),
+    cfg.ListOpt('prewarm_regions',
+                default=[],
+                help='Remote regions whose credentials are checked and '
+                     'clients prepared on start if '
+                     'check_credentials_on_start is True.'),
 ]
 
 
@@ -12,30 +12,48 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import datetime
+import time
+
 from neutron_lib.callbacks import events
 from neutron_lib.callbacks import registry
+from neutron_lib import context as n_context
+from neutron_lib.db import api as db_api
+from neutron_lib import exceptions as n_exc
 
 from keystoneauth1.exceptions import http as k_exc
 from neutronclient.common import exceptions as n_client_exc
 from oslo_config import cfg
+from oslo_db import exception as db_exc
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 
+from networking_interconnection.common import cache
 from networking_interconnection.common import clients
 from networking_interconnection.common import constants
+from networking_interconnection.common import utils
 from networking_interconnection.db import interconnaction_db as intc_db
 from networking_interconnection.extensions import interconnection as intc_exc
-from networking_interconnection.neutronclient.osc.v2 import (
-    interconnection as osc_v2)
 from networking_interconnection import opts
+from networking_interconnection.plugins.ml2 import worker
 
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
+# name of the position of reconciliation in the database
+RECONCILE_CURSOR = 'reconcile'
+# seconds between removals of old state transitions
+TRANSITIONS_PURGE_INTERVAL = 3600
 
 
 @registry.has_registry_receivers
 class InterconnectionPlugin(intc_exc.InterconnectionPluginBase,
                             intc_db.InterconnectionPluginDb):
 
+    __native_bulk_support = True
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     def __init__(self):
         super(InterconnectionPlugin, self).__init__()
 
@@ -47,10 +65,65 @@ class InterconnectionPlugin(intc_exc.InterconnectionPluginBase,
 
         self.mngr = clients.ClientManager(CONF.interconnection)
 
+        # (region, project_id) -> domain name
+        self._domain_names = cache.LRUCache(
+            self.cfg.domain_cache_size, ttl=self.cfg.domain_cache_ttl)
+
+        # (region, bgpvpn_id) -> BGPVPN
+        self._bgpvpns = cache.LRUCache(
+            self.cfg.bgpvpn_cache_size, ttl=self.cfg.bgpvpn_cache_ttl)
+
         self.db = intc_db.InterconnectionPluginDb()
 
+        self._reconcile_limiter = utils.RateLimiter(
+            self.cfg.reconcile_region_rate)
+
+        # monotonic time of the last removal of old state transitions
+        self._transitions_purged_at = -TRANSITIONS_PURGE_INTERVAL
+
     def create_interconnection(self, context, interconnection):
-        data = interconnection[constants.API_RESOURCE_NAME]
+        return self._create_interconnections(context, [interconnection])[0]
+
+    def create_interconnection_bulk(self, context, interconnections):
+        """Create many interconnections in one database transaction.
+
+        All of them are validated before anything is written, so one
+        invalid interconnection fails the whole request.
+        """
+        return self._create_interconnections(
+            context, interconnections[constants.API_COLLECTION_NAME])
+
+    def _create_interconnections(self, context, interconnections):
+        items = [intcn[constants.API_RESOURCE_NAME]
+                 for intcn in interconnections]
+        # checks of the database come first, they don't call remote APIs
+        for data in items:
+            self._check_interconnection(context, data)
+        bgpvpns = self._prefetch_bgpvpns(items) if len(items) > 1 else {}
+        validated = utils.run_concurrently(
+            self.cfg.bulk_validation_concurrency,
+            [(self._validate_interconnection, data, bgpvpns)
+             for data in items])
+        db_objs, jobs = [], []
+        with db_api.CONTEXT_WRITER.using(context):
+            for data, _, _, _ in validated:
+                try:
+                    db_obj = self.db.create_interconnection(context, data)
+                except db_exc.DBDuplicateEntry:
+                    raise intc_exc.DuplicateInterconnaction(
+                        local_resource_id=data['local_resource_id'],
+                        remote_resource_id=data['remote_resource_id'])
+                db_objs.append(db_obj)
+                # nothing to validate if remote interconection is not ready
+                if db_obj['remote_interconnection_id']:
+                    jobs.append(self.db.create_sync_job(
+                        context, events.AFTER_CREATE, db_obj))
+        self._run_sync_jobs(context, jobs)
+        return db_objs
+
+    def _check_interconnection(self, context, data):
+        """Check a new interconnection against existing ones and regions.
+        """
         intcs = self.db.get_interconnections(
             context,
             filters={
@@ -58,199 +131,693 @@ class InterconnectionPlugin(intc_exc.InterconnectionPluginBase,
                 'local_resource_id': [data['local_resource_id']],
                 'remote_resource_id': [data['remote_resource_id']]},
             fields=['id'])
-        # We have to check conflict before changing any statuses because
-        # of that we cannot use database unique key, it's too late
+        # We have to check conflict before changing any statuses, the
+        # database unique key only protects against concurrent requests
         if intcs:
             raise intc_exc.DuplicateInterconnaction(
                 local_resource_id=data['local_resource_id'],
                 remote_resource_id=data['remote_resource_id'])
+        if not self.cfg.allow_regions_coincidence:
+            self._validate_regions(data)
+
+    def _prefetch_bgpvpns(self, items):
+        """Fetch BGPVPNs of many new interconnections by one call per region.
+
+        Returns BGPVPNs by (region, ID), missing ones are left to the
+        validation of their interconnection.
+        """
+        ids_by_region = {}
+        for data in items:
+            ids_by_region.setdefault(self.cfg.region_name, set()).add(
+                data['local_resource_id'])
+            ids_by_region.setdefault(data['remote_region'], set()).add(
+                data['remote_resource_id'])
+        regions = list(ids_by_region)
+        found = utils.run_concurrently(
+            self.cfg.validation_concurrency,
+            [(self._get_bgpvpns, self.mngr.get_clients(region)[0],
+              ids_by_region[region]) for region in regions])
+        bgpvpns = {}
+        for region, (region_bgpvpns, _) in zip(regions, found):
+            for bgpvpn in region_bgpvpns.values():
+                self._cache_bgpvpn(region, bgpvpn)
+                bgpvpns[(region, bgpvpn['id'])] = bgpvpn
+        return bgpvpns
+
+    def _validate_interconnection(self, data, bgpvpns=None):
+        """Validate a new interconnection, fill its state and parameters.
+
+        Returns the data, local and remote resources and the remote
+        interconnection if it's given. BGPVPNs which were already fetched
+        can be given by (region, ID).
+        """
         if not data['remote_interconnection_id']:
             data['state'] = constants.STATE_WAITING
         else:
             data['state'] = constants.STATE_VALIDATING
-        if not self.cfg.allow_regions_coincidence:
-            self._validate_regions(data)
         remote_neutron, remote_keystone = self.mngr.get_clients(
             data['remote_region'])
-        local_neutron, local_keystone = self.mngr.get_clients(
-            self.cfg.region_name)
-        local, remote = self._validate_resources(
-            data, remote_neutron, remote_keystone, local_neutron,
-            local_keystone)
-        self._validate_remote_interconnection(
-            data, remote_neutron, remote_keystone, local_keystone)
+        _, local_keystone = self.mngr.get_clients(self.cfg.region_name)
+        local, remote, r_intcn, domains = self._get_validation_data(
+            data, remote_neutron, remote_keystone, local_keystone,
+            bgpvpns or {})
+        self._validate_resources(data, local, remote, domains)
+        self._validate_remote_interconnection(data, r_intcn, domains)
         data['local_parameters'] = self._get_parameters(local)
         data['remote_parameters'] = self._get_parameters(remote)
-        db_obj = self.db.create_interconnection(context, data)
-        # Neutron Callback System the only one way how we can start validating
-        # interconnection in background. This notification will be catch by
-        # _validating_interconnection function.
-        registry.publish(
-            constants.INVTERCONNECTION_RESOURCE,
-            events.AFTER_CREATE, self,
-            payload=events.DBEventPayload(
-                context,
-                metadata={
-                    "interconnection": db_obj,
-                    "local_resource": local,
-                    "remote_resource": remote,
-                    "remote_neutron": remote_neutron,
-                    "local_neutron": local_neutron,
-                }
-            )
-        )
-        return db_obj
+        return data, local, remote, r_intcn
 
-    def get_interconnections(self, context, filters=None, fields=None):
-        return self.db.get_interconnections(context, filters, fields)
+    def get_interconnections(self, context, filters=None, fields=None,
+                             sorts=None, limit=None, marker=None,
+                             page_reverse=False):
+        return self.db.get_interconnections(
+            context, filters, fields, sorts, limit, marker, page_reverse)
 
     def get_interconnection(self, context, id, fields=None):
         return self.db.get_interconnection(context, id, fields)
 
     def update_interconnection(self, context, id, interconnection):
         data = interconnection[constants.API_RESOURCE_NAME]
-        db_obj = self.db.update_interconnection(context, id, data)
-        # if state was changed to VALIDATED we have to synchronize resources
-        if data.get('state') and data['state'] == constants.STATE_VALIDATED:
-            # Neutron Callback System the only one way how we can start
-            # synchronization in background.
-            registry.publish(
-                constants.INVTERCONNECTION_RESOURCE,
-                events.AFTER_UPDATE, self,
-                payload=events.DBEventPayload(
-                    context,
-                    metadata={
-                        "interconnection": db_obj,
-                    }
-                )
-            )
+        jobs = []
+        with db_api.CONTEXT_WRITER.using(context):
+            db_obj = self.db.update_interconnection(context, id, data)
+            # if state was changed to VALIDATED we have to synchronize
+            # resources
+            if data.get('state') == constants.STATE_VALIDATED:
+                jobs.append(self.db.create_sync_job(
+                    context, events.AFTER_UPDATE, db_obj))
+        self._run_sync_jobs(context, jobs)
         return db_obj
 
     def delete_interconnection(self, context, id):
-        db_obj = self.db.delete_interconnection(context, id)
-        # Neutron Callback System the only one way how we can start
-        # synchronization in background.
-        registry.publish(
-            constants.INVTERCONNECTION_RESOURCE,
-            events.AFTER_DELETE, self,
-            payload=events.DBEventPayload(
-                context,
-                metadata={
-                    "interconnection": db_obj,
-                }
-            )
-        )
+        with db_api.CONTEXT_WRITER.using(context):
+            db_obj = self.db.delete_interconnection(context, id)
+            job = self.db.create_sync_job(
+                context, events.AFTER_DELETE, db_obj)
+        self._run_sync_jobs(context, [job])
         return db_obj
 
-    @registry.receives(
-        constants.INVTERCONNECTION_RESOURCE, [events.AFTER_CREATE])
-    def _sync_interconnections(self, resource, event, trigger, payload):
-        intcn = payload.metadata.get('interconnection')
-        local_neutron = payload.metadata.get('local_neutron')
-        remote_neutron = payload.metadata.get('remote_neutron')
-        # nothing to validate if remote interconection is not ready
-        if not intcn['remote_interconnection_id']:
+    def delete_interconnection_bulk(self, context, ids):
+        """Delete many interconnections in one database transaction.
+
+        Every interconnection gets its own sync job, jobs of the same local
+        BGPVPN are executed together, so it is updated once for all of
+        them, see _execute_sync_jobs.
+        """
+        with db_api.CONTEXT_WRITER.using(context):
+            db_objs = self.db.delete_interconnections(context, ids)
+            jobs = [self.db.create_sync_job(
+                context, events.AFTER_DELETE, db_obj) for db_obj in db_objs]
+        self._run_sync_jobs(context, jobs)
+        return db_objs
+
+    def get_activation_times(self, context, filters=None, fields=None,
+                             sorts=None, limit=None, marker=None,
+                             page_reverse=False):
+        """Get p50 and p95 of time-to-ACTIVE in seconds per remote region.
+
+        Statistics are ordered by region, sorts aren't supported.
+        """
+        times = self.db.get_activation_times(
+            context, (filters or {}).get('remote_region'), limit, marker,
+            page_reverse)
+        return [self._make_activation_time_dict(region, times[region],
+                                                fields)
+                for region in sorted(times)]
+
+    def get_activation_time(self, context, id, fields=None):
+        times = self.db.get_activation_times(context, [id])
+        if id not in times:
+            raise intc_exc.ActivationTimeNotFound(remote_region=id)
+        return self._make_activation_time_dict(id, times[id], fields)
+
+    def _make_activation_time_dict(self, region, seconds, fields=None):
+        seconds = sorted(seconds)
+        res = {
+            'remote_region': region,
+            'count': len(seconds),
+            'p50': utils.percentile(seconds, 50),
+            'p95': utils.percentile(seconds, 95),
+        }
+        return utils.filter_fields(res, fields)
+
+    def get_workers(self):
+        workers = []
+        if self.cfg.sync_workers:
+            workers.append(worker.PeriodicWorker(
+                self.process_sync_jobs, self.cfg.sync_workers,
+                self.cfg.sync_interval, 'interconnection sync worker'))
+        if self.cfg.reconcile_interval:
+            workers.append(worker.PeriodicWorker(
+                self.reconcile_interconnections, 1,
+                self.cfg.reconcile_interval,
+                'interconnection reconcile worker'))
+        return workers
+
+    def _run_sync_jobs(self, context, jobs):
+        """Execute jobs in place if there are no sync workers.
+
+        Synchronization talks to remote regions, so jobs are written in the
+        same transaction as the interconnection change and executed by sync
+        workers to not block the API request. A crash after the commit
+        can't lose them.
+        """
+        if self.cfg.sync_workers:
+            return
+        self._execute_sync_jobs(context, jobs)
+
+    @registry.receives(constants.BGPVPN_RESOURCE, [events.BEFORE_RESPONSE])
+    def _bgpvpn_updated(self, resource, event, trigger, payload):
+        """Tell peers that export targets of a local BGPVPN were changed.
+
+        Each peer updates import targets of its BGPVPN by the difference
+        between the targets it imports for the interconnection and the
+        current export targets, see _sync_resources.
+
+        The API loads the original BGPVPN without attributes which have
+        a default, export targets included. Then the request body tells if
+        they were updated, the pecan API passes it undecoded. A body which
+        can't be decoded counts as a change, peers then find nothing to
+        update.
+        """
+        if payload.method_name != resource + '.update.end':
+            return
+        old, new = payload.states
+        new = new.get(resource) or {}
+        if 'export_targets' not in new:
+            return
+        if 'export_targets' in old:
+            if set(old['export_targets'] or []) == set(new['export_targets']):
+                return
+        else:
+            body = payload.request_body
+            if isinstance(body, (bytes, str)):
+                try:
+                    body = jsonutils.loads(body)
+                except ValueError:
+                    body = None
+            if (isinstance(body, dict) and
+                    'export_targets' not in (body.get(resource) or {})):
+                return
+        context = n_context.get_admin_context()
+        intcns = self.db.get_interconnections(
+            context, filters={'local_resource_id': [new['id']],
+                              'state': [constants.STATE_ACTIVE]})
+        self._run_sync_jobs(context, [
+            self.db.create_sync_job(
+                context, constants.EVENT_EXPORT_TARGETS_CHANGED, intcn)
+            for intcn in intcns])
+
+    def process_sync_jobs(self):
+        """Execute sync jobs which are due, returns number of executed jobs.
+        """
+        context = n_context.get_admin_context()
+        self._purge_state_transitions(context)
+        jobs = self.db.get_sync_jobs(context, self.cfg.sync_batch_size)
+        self._execute_sync_jobs(context, jobs)
+        return len(jobs)
+
+    def _purge_state_transitions(self, context):
+        """Delete old state transitions, at most once per hour."""
+        if (not self.cfg.state_transitions_retention or
+                time.monotonic() < self._transitions_purged_at +
+                TRANSITIONS_PURGE_INTERVAL):
+            return
+        self._transitions_purged_at = time.monotonic()
+        deleted = self.db.delete_state_transitions(
+            context, timeutils.utcnow() - datetime.timedelta(
+                days=self.cfg.state_transitions_retention))
+        if deleted:
+            LOG.info('Deleted %s state transitions of interconnections '
+                     'older than %s days.', deleted,
+                     self.cfg.state_transitions_retention)
+
+    def _execute_sync_jobs(self, context, jobs):
+        """Execute jobs, jobs of the same local BGPVPN are executed together.
+
+        Jobs changing import targets of a local BGPVPN are collected, so
+        the BGPVPN is updated once for all of them. Interconnections are
+        read again, jobs of deleted ones fail permanently.
+        """
+        by_bgpvpn = {}
+        for job in jobs:
+            # another worker could take the job in the meantime
+            if not self.db.claim_sync_job(
+                    context, job['id'], self.cfg.sync_job_timeout):
+                continue
+            if job['event'] != events.AFTER_DELETE:
+                try:
+                    job['interconnection'] = self.db.get_interconnection(
+                        context, job['interconnection']['id'])
+                except Exception as err:
+                    self._sync_job_failed(context, job, err)
+                    continue
+            if job['event'] in (events.AFTER_UPDATE, events.AFTER_DELETE):
+                by_bgpvpn.setdefault(
+                    job['interconnection']['local_resource_id'],
+                    []).append(job)
+                continue
+            try:
+                self._sync_interconnection(context, job)
+            except Exception as err:
+                self._sync_job_failed(context, job, err)
+            else:
+                self.db.delete_sync_job(context, job['id'])
+        for bgpvpn_id, bgpvpn_jobs in by_bgpvpn.items():
+            self._sync_resources(context, bgpvpn_id, bgpvpn_jobs)
+
+    def _sync_interconnection(self, context, job):
+        intcn = job['interconnection']
+        if job['event'] == events.AFTER_CREATE:
+            self._sync_interconnections(context, intcn)
+        elif job['event'] == constants.EVENT_EXPORT_TARGETS_CHANGED:
+            # the peer synchronizes its resource again
+            remote_neutron, _ = self.mngr.get_clients(
+                intcn['remote_region'])
+            self._update_interconnection(
+                remote_neutron, intcn['remote_interconnection_id'],
+                state=constants.STATE_VALIDATED)
+
+    def _sync_job_failed(self, context, job, err):
+        intcn = job['interconnection']
+        attempts = job['attempts'] + 1
+        retry = (self.cfg.sync_workers and
+                 attempts < self.cfg.sync_max_attempts and
+                 not self._is_permanent_error(err))
+        if retry:
+            delay = utils.backoff(attempts, self.cfg.sync_retry_interval,
+                                  self.cfg.sync_retry_max_interval)
+            LOG.warning('Synchronization %s of interconnection %s failed, '
+                        'attempt %s of %s, next one in %d seconds. '
+                        'Details: %s', job['event'], intcn['id'], attempts,
+                        self.cfg.sync_max_attempts, delay, err)
+            self.db.reschedule_sync_job(
+                context, job['id'], attempts, delay, str(err))
             return
-        # set state VALIDATED for each side to start resources synchronization
-        # see _sync_resources function. We have to update local interconnection
-        # via API instead of database because we need to start background
-        # action for AFTER_UPDATE event on each side in the same way.
+        self.db.delete_sync_job(context, job['id'])
+        if job['event'] == constants.EVENT_EXPORT_TARGETS_CHANGED:
+            # the interconnection keeps working with the targets the peer
+            # knows, reconciliation of the peer picks up the change
+            LOG.error('Could not notify the peer of interconnection %s '
+                      'about changed export targets of bgpvpn %s. Details: '
+                      'request_ids=%s msg=%s', intcn['id'],
+                      intcn['local_resource_id'],
+                      getattr(err, 'request_ids', None), err)
+            return
+        LOG.error('Could not synchronize targets for local resource bgpvpn'
+                  ' with ID %s. Details: request_ids=%s msg=%s',
+                  intcn['local_resource_id'],
+                  getattr(err, 'request_ids', None), err)
+        # only interconnections which could not be set up are torn down
+        if job['event'] in (events.AFTER_CREATE, events.AFTER_UPDATE):
+            try:
+                self.db.update_interconnection(
+                    context, intcn['id'],
+                    {'state': constants.STATE_TEARDOWN})
+            except intc_exc.NotFound:
+                # interconnection was deleted in the meantime
+                pass
+
+    def reconcile_interconnections(self):
+        """Restore import targets of local BGPVPNs of ACTIVE interconnections.
+
+        Remote export targets missing in import targets are added. Tracked
+        targets which the remote resource doesn't export anymore or which
+        belong to deleted interconnections are removed unless another
+        interconnection needs them. Targets not added by interconnections
+        are never removed, and orphaned targets are only found for BGPVPNs
+        which still have an ACTIVE interconnection.
+
+        Each call checks the next batch of ACTIVE interconnections, so the
+        whole table is walked through in several calls and remote regions
+        see at most reconcile_batch_size resources per call. The position
+        is stored in the database, restarted workers continue from it.
+        """
+        context = n_context.get_admin_context()
+        intcns = self.db.get_interconnections_batch(
+            context, constants.STATE_ACTIVE,
+            self.db.get_reconcile_cursor(context, RECONCILE_CURSOR),
+            self.cfg.reconcile_batch_size)
+        # start from the beginning after the last batch
+        cursor = (
+            intcns[-1]['id'] if len(intcns) == self.cfg.reconcile_batch_size
+            else None)
+        try:
+            self.db.set_reconcile_cursor(context, RECONCILE_CURSOR, cursor)
+        except db_exc.DBDuplicateEntry:
+            # a worker of another server saved its cursor at the same time
+            pass
+        if not intcns:
+            return
+        # fetch all involved BGPVPNs with bulk calls per region
+        ids_by_region = {self.cfg.region_name: set()}
+        for intcn in intcns:
+            ids_by_region[self.cfg.region_name].add(
+                intcn['local_resource_id'])
+            ids_by_region.setdefault(intcn['remote_region'], set()).add(
+                intcn['remote_resource_id'])
+        bgpvpns = {}
+        for region, ids in ids_by_region.items():
+            try:
+                neutron, _ = self.mngr.get_clients(region)
+                bgpvpns[region], not_found = self._get_bgpvpns(
+                    neutron, ids,
+                    before_call=lambda: self._reconcile_limiter.wait(region))
+                for bgpvpn in bgpvpns[region].values():
+                    self._cache_bgpvpn(region, bgpvpn)
+            except Exception as err:
+                LOG.warning('Could not reconcile interconnections with '
+                            'region %s. Details: %s', region, err)
+                bgpvpns[region] = {}
+                continue
+            if not_found:
+                LOG.warning('BGPVPNs %s of ACTIVE interconnections not found '
+                            'in region %s.', sorted(not_found), region)
+        by_bgpvpn = {}
+        for intcn in intcns:
+            by_bgpvpn.setdefault(intcn['local_resource_id'], []).append(intcn)
+        for bgpvpn_id, bgpvpn_intcns in by_bgpvpn.items():
+            local_res = bgpvpns[self.cfg.region_name].get(bgpvpn_id)
+            if local_res:
+                self._reconcile_bgpvpn(
+                    context, local_res, bgpvpn_intcns, bgpvpns)
+
+    def _reconcile_bgpvpn(self, context, local_res, intcns, bgpvpns):
+        """Compare import targets of a local BGPVPN with the desired ones.
+
+        Targets of interconnections of the batch are taken from their
+        remote resources, other interconnections keep their tracked ones.
+        The BGPVPN is locked like by sync jobs.
+        """
+        self.db.create_bgpvpn_lock(context, local_res['id'])
+        with db_api.CONTEXT_WRITER.using(context):
+            self.db.lock_bgpvpn(context, local_res['id'])
+            tracked = self.db.get_route_targets(context, local_res['id'])
+            existing = {
+                intcn['id'] for intcn in self.db.get_interconnections(
+                    context,
+                    filters={'local_resource_id': [local_res['id']]},
+                    fields=['id'])}
+            needed = {intcn_id: targets
+                      for intcn_id, targets in tracked.items()
+                      if intcn_id in existing}
+            exports, changed = set(), {}
+            for intcn in intcns:
+                remote_res = bgpvpns[intcn['remote_region']].get(
+                    intcn['remote_resource_id'])
+                if not remote_res:
+                    continue
+                targets = set(remote_res['export_targets'])
+                exports |= targets
+                if needed.get(intcn['id']) != targets:
+                    needed[intcn['id']] = changed[intcn['id']] = targets
+            imports = set(local_res['import_targets'])
+            add = exports - imports
+            remove = (set().union(*tracked.values()) -
+                      set().union(*needed.values())) & imports
+            if add or remove:
+                LOG.info('Restoring import targets %s and removing %s of '
+                         'bgpvpn %s.', sorted(add), sorted(remove),
+                         local_res['id'])
+                try:
+                    self._reconcile_limiter.wait(self.cfg.region_name)
+                    self._update_import_targets(
+                        local_res['id'], [(add, remove)])
+                except n_client_exc.NeutronClientException as err:
+                    LOG.warning('Could not reconcile import targets of '
+                                'bgpvpn %s. Details: request_ids=%s msg=%s',
+                                local_res['id'], err.request_ids, err)
+                    # keep tracked targets to be removed next time
+                    return
+            # tracking is corrected after the BGPVPN like by sync jobs
+            for intcn_id, targets in changed.items():
+                self.db.set_route_targets(
+                    context, intcn_id, local_res['id'], targets)
+            for intcn_id in set(tracked) - existing:
+                self.db.delete_route_targets(context, intcn_id)
+
+    def _sync_interconnections(self, context, intcn):
+        """Pair both sides and start synchronization of their resources.
+
+        The remote side gets its peer and state VALIDATED by one call and
+        starts its own synchronization, see _sync_resources. The local
+        side is updated in-process, its synchronization is a new job.
+        """
+        remote_neutron, _ = self.mngr.get_clients(intcn['remote_region'])
         self._update_interconnection(
             remote_neutron, intcn['remote_interconnection_id'],
             state=constants.STATE_VALIDATED,
             remote_interconnection_id=intcn['id'])
-        self._update_interconnection(
-            local_neutron, intcn['id'],
-            state=constants.STATE_VALIDATED)
-
-    @registry.receives(
-        constants.INVTERCONNECTION_RESOURCE, [events.AFTER_UPDATE,
-                                              events.AFTER_DELETE])
-    def _sync_resources(self, resource, event, trigger, payload):
-        intcn = payload.metadata.get('interconnection')
-        context = payload.context
+        self.update_interconnection(
+            context, intcn['id'],
+            {constants.API_RESOURCE_NAME: {
+                'state': constants.STATE_VALIDATED}})
+
+    def _sync_resources(self, context, bgpvpn_id, jobs):
+        """Synchronize import targets of a local BGPVPN for its jobs.
+
+        Remote export targets are fetched first. Then the BGPVPN is locked,
+        each job computes targets its interconnection adds and removes from
+        the tracked route targets and the BGPVPN is updated once with all
+        changes in the order of jobs. A job which fails before the update
+        is retried alone.
+        """
+        failed = []
+        # remote resources are not fetched while the BGPVPN is locked
+        tracked = self.db.get_route_targets(context, bgpvpn_id)
+        exports, ready = {}, []
+        for job in jobs:
+            intcn = job['interconnection']
+            try:
+                if job['event'] == events.AFTER_UPDATE:
+                    exports[job['id']] = self._get_remote_exports(
+                        intcn, refresh=intcn['id'] in tracked)
+                elif intcn['id'] not in tracked:
+                    # interconnection was synchronized before targets were
+                    # tracked, the remote resource knows them
+                    exports[job['id']] = self._get_remote_exports(intcn)
+            except Exception as err:
+                failed.append((job, err))
+                continue
+            ready.append(job)
+        if ready:
+            self.db.create_bgpvpn_lock(context, bgpvpn_id)
+            try:
+                with db_api.CONTEXT_WRITER.using(context):
+                    self.db.lock_bgpvpn(context, bgpvpn_id)
+                    failed += self._apply_route_targets(
+                        context, bgpvpn_id, ready, exports)
+            except Exception as err:
+                # the transaction was rolled back, all jobs are repeated
+                failed += [(job, err) for job in ready]
+        for job, err in failed:
+            self._sync_job_failed(context, job, err)
+
+    def _apply_route_targets(self, context, bgpvpn_id, jobs, exports):
+        """Update import targets of a locked BGPVPN and their tracking.
+
+        Returns jobs which failed with their errors, others are done.
+        """
+        # targets of the BGPVPN by interconnection, changed by each job
+        targets = self.db.get_route_targets(context, bgpvpn_id)
+        changes = []
+        for job in jobs:
+            if job['event'] == events.AFTER_UPDATE:
+                change = self._add_route_targets(
+                    context, job['interconnection'], targets,
+                    exports[job['id']])
+            else:
+                change = self._remove_route_targets(
+                    context, job['interconnection'], targets,
+                    exports.get(job['id'], set()))
+            changes.append((job, change))
         try:
-            # get local and remote clients
-            local_neutron, _ = self.mngr.get_clients(self.cfg.region_name)
-            remote_neutron, _ = self.mngr.get_clients(intcn['remote_region'])
-            # get local and remote resources
-            remote_res = self._get_bgpvpn(
-                remote_neutron, intcn['remote_resource_id'])
-            local_res = self._get_bgpvpn(
-                local_neutron, intcn['local_resource_id'])
-            if event == events.AFTER_UPDATE:
-                # import/export targets synchronization
-                imports = set(
-                    local_res['import_targets'] + remote_res['export_targets'])
-                local_neutron.update_bgpvpn(
-                    intcn['local_resource_id'],
-                    body={'bgpvpn': {'import_targets': list(imports)}})
-                # update interconnection to ACTIVE
-                self.db.update_interconnection(
-                    context, intcn['id'], {'state': constants.STATE_ACTIVE})
-            if event == events.AFTER_DELETE:
-                # import/export targets synchronization
-                imports = set(
-                    local_res['import_targets']) - set(
-                        remote_res['export_targets'])
-                local_neutron.update_bgpvpn(
-                    intcn['local_resource_id'],
-                    body={'bgpvpn': {'import_targets': list(imports)}})
-        except n_client_exc.NeutronClientException as err:
-            LOG.error('Could not synchronize targets for local resource bgpvpn'
-                      ' with ID %s. Details: request_ids=%s msg=%s',
-                      (intcn['local_resource_id'], err.request_ids, err))
-            if event != events.AFTER_DELETE:
-                self.db.update_interconnection(
-                    context, intcn['id'],
-                    {'state': constants.STATE_TEARDOWN})
+            self._update_import_targets(
+                bgpvpn_id, [(add, remove) for _, (add, remove, _) in changes])
+        except Exception as err:
+            return [(job, err) for job, _ in changes]
+        failed = []
+        for job, (_, _, done) in changes:
+            try:
+                done()
+            except Exception as err:
+                failed.append((job, err))
+            else:
+                self.db.delete_sync_job(context, job['id'])
+        return failed
+
+    def _get_remote_exports(self, intcn, refresh=False):
+        """Get export targets of the remote resource of an interconnection.
+
+        Without refresh the cached resource is used, validation could have
+        fetched it.
+        """
+        if not refresh:
+            return set(self._get_cached_bgpvpn(
+                intcn['remote_region'],
+                intcn['remote_resource_id'])['export_targets'])
+        remote_neutron, _ = self.mngr.get_clients(intcn['remote_region'])
+        remote_res = self._get_bgpvpn(
+            remote_neutron, intcn['remote_resource_id'])
+        self._cache_bgpvpn(intcn['remote_region'], remote_res)
+        return set(remote_res['export_targets'])
+
+    def _add_route_targets(self, context, intcn, targets, exports):
+        """Get targets a validated interconnection adds and removes.
+
+        Returns added and removed targets and a function which stores the
+        result after the local resource was updated.
+        """
+        imported = targets.pop(intcn['id'], set())
+        # targets the remote resource doesn't export anymore and no
+        # other interconnection needs
+        unused = (imported - exports).difference(*targets.values())
+        targets[intcn['id']] = exports
+
+        def done():
+            # update interconnection to ACTIVE, fails if it was deleted in
+            # the meantime, its delete job then removes the added targets
+            self.db.update_interconnection(
+                context, intcn['id'], {'state': constants.STATE_ACTIVE})
+            # remember which targets the interconnection needs
+            self.db.set_route_targets(
+                context, intcn['id'], intcn['local_resource_id'], exports)
+        return exports, unused, done
+
+    def _remove_route_targets(self, context, intcn, targets, exports):
+        """Get targets of a deleted interconnection which can be removed.
+
+        Only targets which are not needed by other interconnections of the
+        local resource are removed. Exports of the remote resource are used
+        if the targets of the interconnection were not tracked.
+        """
+        own = targets.pop(intcn['id'], exports)
+        unused = own.difference(*targets.values())
+
+        def done():
+            self.db.delete_route_targets(context, intcn['id'])
+        return set(), unused, done
+
+    def _update_import_targets(self, bgpvpn_id, changes):
+        """Apply (add, remove) changes of import targets of a local BGPVPN.
+
+        The caller holds the lock of the BGPVPN, see
+        InterconnectionPluginDb.lock_bgpvpn, so changes of other workers
+        are not lost.
+        """
+        add, remove = set(), set()
+        for to_add, to_remove in changes:
+            add = (add - set(to_remove)) | set(to_add)
+            remove = (remove - set(to_add)) | set(to_remove)
+        local_neutron, _ = self.mngr.get_clients(self.cfg.region_name)
+        imports = set(
+            self._get_bgpvpn(local_neutron, bgpvpn_id)['import_targets'])
+        new_imports = (imports - remove) | add
+        if new_imports == imports:
+            return
+        # the whole list is sent, so a repeated update is harmless
+        self._call_with_retries(
+            local_neutron.update_bgpvpn,
+            bgpvpn_id,
+            body={'bgpvpn': {'import_targets': list(new_imports)}})
+        self._bgpvpns.pop((self.cfg.region_name, bgpvpn_id))
+
+    def _is_retryable_error(self, err):
+        return (isinstance(err, n_client_exc.NeutronClientException) and
+                err.status_code in self.cfg.retryable_status_codes)
+
+    def _is_permanent_error(self, err):
+        """Check if another attempt of a sync job would fail the same way."""
+        # resources or the interconnection itself were deleted
+        if isinstance(err, (intc_exc.ResourceNotFound, n_exc.NotFound)):
+            return True
+        return (isinstance(err, n_client_exc.NeutronClientException) and
+                400 <= err.status_code < 500 and
+                not self._is_retryable_error(err))
+
+    def _call_with_retries(self, func, *args, **kwargs):
+        """Call a remote API, retry it on transient errors.
+
+        Only idempotent calls may be retried: reads and updates which set
+        absolute values.
+        """
+        return utils.retry(
+            func, self.cfg.sync_call_attempts,
+            self.cfg.sync_call_retry_interval,
+            self.cfg.sync_call_retry_max_interval,
+            self._is_retryable_error)(*args, **kwargs)
 
     def _update_interconnection(self, client, id, **kwargs):
-        client.put(
-            osc_v2.PATH_SINGLE + id,
+        self._call_with_retries(
+            client.put,
+            constants.API_PATH_SINGLE + id,
             body={constants.API_RESOURCE_NAME: kwargs})
 
-    def _validate_resources(self, data, remote_neutron, remote_keystone,
-                            local_neutron, local_keystone):
-        # get local and remote resources
-        remote_res = self._get_bgpvpn(
-            remote_neutron, data['remote_resource_id'])
-        local_res = self._get_bgpvpn(local_neutron, data['local_resource_id'])
+    def _get_validation_data(self, data, remote_neutron, remote_keystone,
+                             local_keystone, bgpvpns):
+        """Fetch everything needed to validate a new interconnection.
+
+        Local and remote sides do not depend on each other, so resources,
+        the remote interconnection and after them the domains of their
+        owners are fetched concurrently.
+        """
+        def get_bgpvpn(region, bgpvpn_id):
+            bgpvpn = bgpvpns.get((region, bgpvpn_id))
+            if bgpvpn is None:
+                bgpvpn = self._get_cached_bgpvpn(region, bgpvpn_id)
+            return bgpvpn
+
+        calls = [
+            (get_bgpvpn, data['remote_region'], data['remote_resource_id']),
+            (get_bgpvpn, self.cfg.region_name, data['local_resource_id']),
+        ]
+        if data['remote_interconnection_id']:
+            calls.append((self._get_remote_interconnection, remote_neutron,
+                          data['remote_interconnection_id']))
+        remote_res, local_res, *r_intcn = utils.run_concurrently(
+            self.cfg.validation_concurrency, calls)
+        r_intcn = r_intcn[0] if r_intcn else None
+        # get domains of owners, each (region, project) pair only once
+        owners = [
+            (data['remote_region'], remote_keystone, remote_res['project_id']),
+            (self.cfg.region_name, local_keystone, local_res['project_id']),
+        ]
+        if r_intcn:
+            owners += [
+                (data['remote_region'], remote_keystone,
+                 r_intcn['project_id']),
+                (self.cfg.region_name, local_keystone, data['project_id']),
+            ]
+        lookups = {}
+        for region, keystone, project_id in owners:
+            lookups.setdefault((region, project_id), keystone)
+        names = utils.run_concurrently(
+            self.cfg.validation_concurrency,
+            [(self._get_domain_name, region, keystone, project_id)
+             for (region, project_id), keystone in lookups.items()])
+        return local_res, remote_res, r_intcn, dict(zip(lookups, names))
+
+    def _validate_resources(self, data, local_res, remote_res, domains):
         # validate owner of resources
-        remote_domain_name = self._get_domain_name(
-            remote_keystone, remote_res['project_id'])
-        local_domain_name = self._get_domain_name(
-            local_keystone, local_res['project_id'])
-        if remote_domain_name != local_domain_name:
+        if not self._same_domain(
+                domains, (data['remote_region'], remote_res['project_id']),
+                (self.cfg.region_name, local_res['project_id'])):
             raise intc_exc.ResourcesOwnedByDifferentDomains()
         # validate targets
         if not remote_res['export_targets']:
             raise intc_exc.BgpvpnExportTargetsIsEpmty(bgpvpn=remote_res['id'])
         if not local_res['export_targets']:
             raise intc_exc.BgpvpnExportTargetsIsEpmty(bgpvpn=local_res['id'])
-        return local_res, remote_res
 
-    def _validate_remote_interconnection(self, data, remote_neutron,
-                                         remote_keystone, local_keystone):
-        if not data['remote_interconnection_id']:
+    def _validate_remote_interconnection(self, data, r_intcn, domains):
+        if not r_intcn:
             return
-        # get remote interconnection
-        r_intcn = remote_neutron.get(
-            osc_v2.PATH_SINGLE + data['remote_interconnection_id']
-        )[constants.API_RESOURCE_NAME]
         # check owner of remote interconnection
-        remote_domain_name = self._get_domain_name(
-            remote_keystone, r_intcn['project_id'])
-        local_domain_name = self._get_domain_name(
-            local_keystone, data['project_id'])
-        if remote_domain_name != local_domain_name:
+        if not self._same_domain(
+                domains, (data['remote_region'], r_intcn['project_id']),
+                (self.cfg.region_name, data['project_id'])):
             raise intc_exc.InterconnectionOwnedByDifferentDomains(
                 local=data['project_id'], remote=r_intcn['project_id'])
-        # update remote interconnection to set state VALIDATING and remote
-        # interconnection ID
-        self._update_interconnection(
-            remote_neutron, data['remote_interconnection_id'],
-            state=constants.STATE_VALIDATING)
         # check local and remote resources
         if (r_intcn['remote_resource_id'] != data['local_resource_id'] or
                 r_intcn['local_resource_id'] != data['remote_resource_id']):
@@ -258,6 +825,15 @@ class InterconnectionPlugin(intc_exc.InterconnectionPluginBase,
                       (data['remote_interconnection_id']))
             raise intc_exc.InvalidRemoteInterconnection()
 
+    def _same_domain(self, domains, remote_key, local_key):
+        if domains[remote_key] == domains[local_key]:
+            return True
+        # cached domains of these projects could be outdated, next attempt
+        # has to ask keystone again
+        self._domain_names.pop(remote_key)
+        self._domain_names.pop(local_key)
+        return False
+
     def _validate_regions(self, data):
         if data['remote_region'] == self.cfg.region_name:
             raise intc_exc.RegionConflict(
@@ -275,16 +851,71 @@ class InterconnectionPlugin(intc_exc.InterconnectionPluginBase,
 
     def _get_bgpvpn(self, neutron_client, bgpvpn_id):
         try:
-            return neutron_client.show_bgpvpn(bgpvpn_id)['bgpvpn']
+            return self._call_with_retries(
+                neutron_client.show_bgpvpn, bgpvpn_id)['bgpvpn']
         except n_client_exc.NotFound:
             raise intc_exc.ResourceNotFound(
                 resource_type='bgpvpn',
                 remote_resource_id=bgpvpn_id)
 
-    def _get_domain_name(self, keystone_client, project_id):
+    def _get_cached_bgpvpn(self, region, bgpvpn_id):
+        """Get a BGPVPN, reuse it if it was fetched recently.
+
+        Bulk validation of interconnections of the same BGPVPN and the
+        synchronization after validation don't fetch it again.
+        """
+        bgpvpn = self._bgpvpns.get((region, bgpvpn_id))
+        if bgpvpn is None:
+            neutron_client, _ = self.mngr.get_clients(region)
+            bgpvpn = self._get_bgpvpn(neutron_client, bgpvpn_id)
+            self._cache_bgpvpn(region, bgpvpn)
+        return bgpvpn
+
+    def _cache_bgpvpn(self, region, bgpvpn):
+        if not self.cfg.bgpvpn_cache_ttl:
+            return
+        key = (region, bgpvpn['id'])
+        cached = self._bgpvpns.get(key)
+        # a response which was delayed must not replace a newer revision
+        if (cached is not None and cached.get('revision_number', 0) >
+                bgpvpn.get('revision_number', 0)):
+            return
+        self._bgpvpns.set(key, bgpvpn)
+
+    def _get_remote_interconnection(self, neutron_client, id):
+        return neutron_client.get(
+            constants.API_PATH_SINGLE + id)[constants.API_RESOURCE_NAME]
+
+    def _get_bgpvpns(self, neutron_client, bgpvpn_ids, before_call=None):
+        """Fetch many BGPVPNs of one region with as few calls as possible.
+
+        Returns a dict of found BGPVPNs by ID and a set of not found IDs.
+        IDs are sent in chunks to not exceed the URL length limit.
+        """
+        ids = sorted(set(bgpvpn_ids))
+        bgpvpns = {}
+        for i in range(0, len(ids), constants.BGPVPN_IDS_PER_REQUEST):
+            if before_call:
+                before_call()
+            chunk = ids[i:i + constants.BGPVPN_IDS_PER_REQUEST]
+            for bgpvpn in neutron_client.list_bgpvpns(id=chunk)['bgpvpns']:
+                bgpvpns[bgpvpn['id']] = bgpvpn
+        return bgpvpns, set(ids) - set(bgpvpns)
+
+    def _get_domain_name(self, region, keystone_client, project_id):
+        key = (region, project_id)
+        name = self._domain_names.get(key)
+        if name is not None:
+            return name
         try:
             project = keystone_client.projects.get(project_id)
-            return keystone_client.domains.get(project.domain_id).name
+            name = keystone_client.domains.get(project.domain_id).name
         except k_exc.NotFound:
             raise intc_exc.ProjectOrDomainNotFound(
                 project_id=project_id)
+        if self.cfg.domain_cache_ttl:
+            self._domain_names.set(key, name)
+        LOG.debug('Domain name of project %s in region %s fetched from '
+                  'keystone, cache stats: %s',
+                  project_id, region, self._domain_names.stats())
+        return name
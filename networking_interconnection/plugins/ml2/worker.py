@@ -0,0 +1,59 @@
+# Copyright (c) 2021 Cloudification GmbH.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from neutron_lib import worker
+from oslo_log import log
+from oslo_service import loopingcall
+
+LOG = log.getLogger(__name__)
+
+
+class PeriodicWorker(worker.BaseWorker):
+    """Neutron worker process that calls a plugin function periodically.
+
+    It is used to execute pending sync jobs, which are stored in the
+    database by API workers, and to reconcile interconnections.
+    """
+
+    def __init__(self, sync_func, process_count, interval, desc):
+        super(PeriodicWorker, self).__init__(
+            worker_process_count=process_count, desc=desc)
+        self._sync_func = sync_func
+        self._interval = interval
+        self._loop = None
+
+    def start(self):
+        super(PeriodicWorker, self).start(desc=self.desc)
+        if self._loop is None:
+            self._loop = loopingcall.FixedIntervalLoopingCall(self._sync)
+        self._loop.start(interval=self._interval)
+
+    def wait(self):
+        if self._loop is not None:
+            self._loop.wait()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.stop()
+
+    def reset(self):
+        self.stop()
+        self.wait()
+        self.start()
+
+    def _sync(self):
+        try:
+            self._sync_func()
+        except Exception:
+            LOG.exception('Iteration of %s failed.', self.desc)
@@ -114,6 +114,21 @@ rules = [
             },
         ]
     ),
+    policy.DocumentedRuleDefault(
+        'get_activation_time',
+        RULE_ADMIN_ONLY,
+        'Get time interconnections need to become ACTIVE per remote region',
+        [
+            {
+                'method': 'GET',
+                'path': '/interconnection/activation_times',
+            },
+            {
+                'method': 'GET',
+                'path': '/interconnection/activation_times/{remote_region}',
+            },
+        ]
+    ),
 ]
 
 
@@ -0,0 +1,52 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Import time of the interconnection plugin.
+
+The plugin is imported in a fresh interpreter like neutron-server does on
+start. Modules which are only needed by the first remote call must not be
+loaded.
+"""
+
+import json
+import subprocess
+import sys
+import unittest
+
+PLUGIN = 'networking_interconnection.plugins.ml2.plugin'
+# imported lazily or not needed by the plugin at all
+LAZY_MODULES = ('keystoneclient', 'osc_lib', 'openstackclient',
+                'neutronclient.neutron')
+
+SCRIPT = '''
+import json, sys, time
+start = time.monotonic()
+import %s
+print(json.dumps({'seconds': time.monotonic() - start,
+                  'modules': sorted(sys.modules)}))
+''' % PLUGIN
+
+
+class ImportBenchmark(unittest.TestCase):
+
+    def test_import_plugin(self):
+        out = subprocess.check_output([sys.executable, '-c', SCRIPT])
+        result = json.loads(out.decode().splitlines()[-1])
+        print('%-40s %8.1fms  modules=%d' % (
+            'import plugin', result['seconds'] * 1000,
+            len(result['modules'])))
+        loaded = [name for name in result['modules']
+                  if any(name == lazy or name.startswith(lazy + '.')
+                         for lazy in LAZY_MODULES)]
+        self.assertEqual([], loaded)
@@ -0,0 +1,192 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmarks of the interconnection plugin.
+
+The plugin runs on SQLite, remote Neutron and Keystone are stubbed with a
+configurable latency and failure rate. Benchmarks are configured by
+environment variables:
+
+* INTERCONNECTION_BENCH_ITERATIONS - number of created, updated and deleted
+  interconnections (default 50)
+* INTERCONNECTION_BENCH_ROWS - comma separated table sizes used by list
+  benchmarks (default 1000,10000)
+* INTERCONNECTION_BENCH_LATENCY - seconds added to each remote call
+  (default 0.01)
+* INTERCONNECTION_BENCH_FAILURE_RATE - share of remote calls which fail
+  (default 0)
+
+Run them by "tox -e benchmark", results are printed to stdout.
+"""
+
+import os
+import random
+import time
+
+from neutron_lib import context
+from neutron_lib.db import api as db_api
+from neutron_lib.plugins import directory
+from neutronclient.common import exceptions as n_client_exc
+from oslo_config import cfg
+from oslo_utils import uuidutils
+
+from networking_interconnection.common import constants
+from networking_interconnection.common import utils
+from networking_interconnection.extensions import interconnection as intc_exc
+from networking_interconnection.tests.unit.plugins.ml2 import test_plugin
+
+ITERATIONS = int(os.environ.get('INTERCONNECTION_BENCH_ITERATIONS', 50))
+ROWS = [int(rows) for rows in os.environ.get(
+    'INTERCONNECTION_BENCH_ROWS', '1000,10000').split(',')]
+LATENCY = float(os.environ.get('INTERCONNECTION_BENCH_LATENCY', 0.01))
+FAILURE_RATE = float(os.environ.get('INTERCONNECTION_BENCH_FAILURE_RATE', 0))
+
+
+def report(name, samples, failures=0):
+    samples = sorted(samples)
+    total = sum(samples)
+    print('%-40s n=%-6d fail=%-4d %8.1f op/s  p50=%7.1fms  p95=%7.1fms  '
+          'p99=%7.1fms  max=%7.1fms' % (
+              name, len(samples), failures,
+              len(samples) / total if total else 0,
+              utils.percentile(samples, 50) * 1000,
+              utils.percentile(samples, 95) * 1000,
+              utils.percentile(samples, 99) * 1000,
+              samples[-1] * 1000))
+
+
+class InterconnectionPluginBenchmark(test_plugin.BaseTestCaseMixin):
+
+    def setUp(self):
+        super(InterconnectionPluginBenchmark, self).setUp()
+        self.intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        self.ctx = context.get_admin_context()
+        self._random = random.Random(0)
+        # only one side of interconnections is created, domain names can
+        # be cached like in production
+        cfg.CONF.set_override('domain_cache_ttl', 3600, 'interconnection')
+        # slow and unreliable remote regions
+        for client in (self.nc_local, self.nc_remote):
+            for name in ('get', 'put', 'show_bgpvpn', 'update_bgpvpn',
+                         'list_bgpvpns'):
+                method = getattr(client, name)
+                method.side_effect = self._remote_call(method.side_effect)
+        self.kc.projects.get.side_effect = self._remote_call(
+            lambda project_id: self.kc.projects.get.return_value)
+        self.kc.domains.get.side_effect = self._remote_call(
+            lambda domain_id: self.kc.domains.get.return_value)
+
+    def _remote_call(self, func):
+        def call(*args, **kwargs):
+            time.sleep(LATENCY)
+            if self._random.random() < FAILURE_RATE:
+                raise n_client_exc.ServiceUnavailable('injected failure')
+            return func(*args, **kwargs)
+        return call
+
+    def _request(self, req):
+        res = req.get_response(self.ext_api)
+        if res.status_int >= 400:
+            raise test_plugin.http_client_error(req, res)
+        return res
+
+    def _create_bgpvpns(self, count, tenant_id, targets):
+        bgpvpns = []
+        for i in range(count):
+            data = {'bgpvpn': {'name': 'bench', 'type': 'l3',
+                               'tenant_id': tenant_id,
+                               'export_targets': [targets % i],
+                               'import_targets': [targets % i]}}
+            res = self._request(
+                self.new_create_request('bgpvpn/bgpvpns', data))
+            bgpvpns.append(self.deserialize('json', res)['bgpvpn'])
+        return bgpvpns
+
+    def _run(self, name, calls):
+        samples, failures = [], 0
+        for func, args in calls:
+            start = time.monotonic()
+            try:
+                func(*args)
+            except Exception:
+                failures += 1
+                continue
+            samples.append(time.monotonic() - start)
+        report(name, samples or [0], failures)
+
+    def test_lifecycle(self):
+        local = self._create_bgpvpns(1, self.tenant_id_1, '5000:%s')[0]
+        remotes = self._create_bgpvpns(ITERATIONS, self.tenant_id_2,
+                                       '6000:%s')
+        created = []
+
+        def create(remote):
+            req = self.new_create_request(
+                'interconnection/interconnections',
+                {'interconnection': {
+                    'name': 'bench', 'tenant_id': self.tenant_id_1,
+                    'local_resource_id': local['id'],
+                    'remote_resource_id': remote['id'],
+                    'remote_region': 'RegionTwo'}})
+            res = self._request(req)
+            created.append(self.deserialize(
+                'json', res)['interconnection']['id'])
+
+        def validate(intcn_id):
+            # starts synchronization of targets
+            self._request(self.new_update_request(
+                'interconnection/interconnections',
+                {'interconnection': {'state': constants.STATE_VALIDATED}},
+                intcn_id))
+
+        def delete(intcn_id):
+            self._request(self.new_delete_request(
+                'interconnection/interconnections', intcn_id))
+
+        self._run('create', [(create, (remote,)) for remote in remotes])
+        self._run('update to VALIDATED',
+                  [(validate, (intcn_id,)) for intcn_id in created])
+        self._run('delete', [(delete, (intcn_id,)) for intcn_id in created])
+
+    def _fill_table(self, rows):
+        with db_api.CONTEXT_WRITER.using(self.ctx):
+            for _ in range(rows):
+                self.intcn_plugin.db.create_interconnection(self.ctx, {
+                    'project_id': self.tenant_id_1,
+                    'name': 'bench',
+                    'type': constants.TYPE_BGPVPN,
+                    'state': constants.STATE_ACTIVE,
+                    'local_resource_id': uuidutils.generate_uuid(),
+                    'remote_resource_id': uuidutils.generate_uuid(),
+                    'remote_region': 'RegionTwo',
+                    'remote_interconnection_id': uuidutils.generate_uuid(),
+                    'local_parameters': {'project_id': [self.tenant_id_1]},
+                    'remote_parameters': {'project_id': [self.tenant_id_2]},
+                })
+
+    def test_list(self):
+        filled = 0
+        for rows in sorted(ROWS):
+            self._fill_table(rows - filled)
+            filled = rows
+            queries = {
+                'all': '',
+                'fields': 'fields=id&fields=state',
+                'page': 'limit=100&sort_key=id&sort_dir=asc',
+            }
+            for name, params in queries.items():
+                calls = [(self._request, (self.new_list_request(
+                    'interconnection/interconnections', params=params),))
+                    for _ in range(5)]
+                self._run('list %s rows (%s)' % (rows, name), calls)
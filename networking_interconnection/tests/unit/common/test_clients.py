@@ -0,0 +1,253 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from neutron.tests import base
+from neutron_lib import exceptions as n_exc
+from neutronclient.common import exceptions as n_client_exc
+from oslo_config import cfg
+import requests
+
+from networking_interconnection.common import clients
+from networking_interconnection.common import utils
+from networking_interconnection.extensions import interconnection as intc_exc
+from networking_interconnection import opts
+
+
+class TestClientManager(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestClientManager, self).setUp()
+        opts.register_interconnection_options(cfg.CONF)
+        self.session = mock.patch.object(clients, 'KeystoneSession').start()
+        mock.patch.object(clients, '_password_auth').start()
+        self.neutron = mock.patch.object(clients, '_neutron_client').start()
+        self.keystone = mock.patch.object(clients, '_keystone_client').start()
+        self.cfg = cfg.CONF.interconnection
+
+    def test_clients_are_cached_per_region(self):
+        mngr = clients.ClientManager(self.cfg)
+        first = mngr.get_clients('RegionOne')
+        self.assertIs(first, mngr.get_clients('RegionOne'))
+        self.assertIsNot(first, mngr.get_clients('RegionTwo'))
+        self.assertEqual(2, self.session.call_count)
+
+    def test_least_recently_used_region_is_evicted(self):
+        cfg.CONF.set_override('client_cache_size', 2, 'interconnection')
+        mngr = clients.ClientManager(self.cfg)
+        one = mngr.get_clients('RegionOne')
+        mngr.get_clients('RegionTwo')
+        mngr.get_clients('RegionOne')
+        mngr.get_clients('RegionThree')
+        self.assertIs(one, mngr.get_clients('RegionOne'))
+        mngr.get_clients('RegionTwo')
+        self.assertEqual(4, self.session.call_count)
+
+    def test_invalidate(self):
+        mngr = clients.ClientManager(self.cfg)
+        mngr.get_clients('RegionOne')
+        mngr.invalidate('RegionOne')
+        mngr.get_clients('RegionOne')
+        self.assertEqual(2, self.session.call_count)
+
+    def test_unauthorized_region_gets_new_clients(self):
+        mngr = clients.ClientManager(self.cfg)
+        first = mngr.get_clients('RegionOne')
+        adapter = self.session.call_args[1]['session'].get_adapter(
+            'https://identity-1.example')
+        with mock.patch.object(clients.TCPKeepAliveAdapter,
+                               'send') as send:
+            send.return_value.status_code = 401
+            adapter.send(mock.Mock(method='GET'))
+        self.assertIsNot(first, mngr.get_clients('RegionOne'))
+
+    def test_http_pool_is_shared_per_region(self):
+        cfg.CONF.set_override('http_pool_maxsize', 3, 'interconnection')
+        mngr = clients.ClientManager(self.cfg)
+        mngr.get_clients('RegionOne')
+        mngr.invalidate('RegionOne')
+        mngr.get_clients('RegionOne')
+        mngr.get_clients('RegionTwo')
+        pools = [c[1]['session'] for c in self.session.call_args_list]
+        self.assertIs(pools[0], pools[1])
+        self.assertIsNot(pools[0], pools[2])
+        adapter = pools[0].get_adapter('https://identity-3.example')
+        self.assertIsInstance(adapter, clients.TCPKeepAliveAdapter)
+        self.assertEqual(3, adapter._pool_maxsize)
+
+    @mock.patch.object(clients.os, 'getpid', return_value=1)
+    def test_forked_process_has_own_clients(self, getpid):
+        mngr = clients.ClientManager(self.cfg)
+        parent = mngr.get_clients('RegionOne')
+        getpid.return_value = 2
+        child = mngr.get_clients('RegionOne')
+        self.assertIsNot(parent, child)
+        self.assertIs(child, mngr.get_clients('RegionOne'))
+        pools = [c[1]['session'] for c in self.session.call_args_list]
+        self.assertIsNot(pools[0], pools[1])
+
+    def test_check_credentials_on_start(self):
+        cfg.CONF.set_override(
+            'check_credentials_on_start', True, 'interconnection')
+        mngr = clients.ClientManager(self.cfg)
+        mngr.warm_up_thread.join()
+        self.keystone.return_value.session.get_token.assert_called_once_with()
+        # local clients were created once during the check
+        mngr.get_clients(self.cfg.region_name)
+        self.assertEqual(1, self.session.call_count)
+
+    def test_warm_up_prewarm_regions(self):
+        cfg.CONF.set_override(
+            'prewarm_regions', ['RegionTwo', self.cfg.region_name],
+            'interconnection')
+        self.keystone.return_value.session.get_token.side_effect = [
+            None, Exception('Unauthorized')]
+        mngr = clients.ClientManager(self.cfg)
+        self.assertIsNone(mngr.warm_up_thread)
+        with mock.patch.object(clients.LOG, 'error') as log_error:
+            mngr.warm_up()
+        self.assertEqual(
+            2, self.keystone.return_value.session.get_token.call_count)
+        log_error.assert_called_once()
+        # clients of both regions are ready for the first request
+        mngr.get_clients(self.cfg.region_name)
+        mngr.get_clients('RegionTwo')
+        self.assertEqual(2, self.session.call_count)
+
+    def test_clients_failed(self):
+        self.neutron.side_effect = Exception('boom')
+        mngr = clients.ClientManager(self.cfg)
+        self.assertRaises(intc_exc.RemoteKeystoneUnavailable,
+                          mngr.get_clients, 'RegionTwo')
+        self.neutron.side_effect = None
+        mngr.get_clients('RegionTwo')
+
+
+class TestGuardedAdapter(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestGuardedAdapter, self).setUp()
+        self.send = mock.patch.object(clients.TCPKeepAliveAdapter,
+                                      'send').start()
+        self.send.return_value.status_code = 200
+        self.breaker = utils.CircuitBreaker(
+            failures=2, reset_timeout=30, max_timeout=10, min_timeout=1,
+            timeout_factor=4)
+        self.adapter = clients.GuardedAdapter(
+            self.breaker, 'https://identity-3.example')
+        self.request = mock.Mock(url='https://network-3.example',
+                                 method='GET')
+
+    def test_timeout_follows_latency(self):
+        self.adapter.send(self.request, timeout=10)
+        self.assertEqual(10, self.send.call_args[1]['timeout'])
+        self.adapter.send(self.request, timeout=10)
+        self.assertEqual(1, self.send.call_args[1]['timeout'])
+
+    def test_fails_fast_when_open(self):
+        self.send.side_effect = requests.ConnectTimeout()
+        self.assertRaises(requests.ConnectTimeout,
+                          self.adapter.send, self.request)
+        self.send.side_effect = None
+        self.send.return_value.status_code = 503
+        self.adapter.send(self.request)
+        self.assertRaises(intc_exc.RemoteKeystoneUnavailable,
+                          self.adapter.send, self.request)
+        self.assertEqual(2, self.send.call_count)
+
+    def test_unauthorized_is_reported(self):
+        self.adapter.on_unauthorized = mock.Mock()
+        self.adapter.send(self.request)
+        self.assertFalse(self.adapter.on_unauthorized.called)
+        self.send.return_value.status_code = 401
+        self.adapter.send(self.request)
+        self.adapter.on_unauthorized.assert_called_once_with()
+
+    def test_writes_keep_timeout(self):
+        self.adapter.send(self.request, timeout=10)
+        self.request.method = 'PUT'
+        self.adapter.send(self.request, timeout=10)
+        self.assertEqual(10, self.send.call_args[1]['timeout'])
+
+    @mock.patch.object(utils.time, 'monotonic')
+    def test_probe_is_finished_on_any_error(self, monotonic):
+        monotonic.return_value = 100
+        self.send.side_effect = requests.ConnectTimeout()
+        for _ in range(2):
+            self.assertRaises(requests.ConnectTimeout,
+                              self.adapter.send, self.request)
+        monotonic.return_value = 200
+        # the probe raises an error which is not a requests one
+        self.send.side_effect = ValueError()
+        self.assertRaises(ValueError, self.adapter.send, self.request)
+        self.assertEqual(utils.CircuitBreaker.OPEN, self.breaker.state)
+        monotonic.return_value = 300
+        self.send.side_effect = None
+        self.adapter.send(self.request)
+        self.assertEqual(utils.CircuitBreaker.CLOSED, self.breaker.state)
+
+
+class TestLocalNeutronClient(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestLocalNeutronClient, self).setUp()
+        self.http = mock.Mock()
+        self.get_plugin = mock.patch.object(
+            clients.directory, 'get_plugin').start()
+        self.plugin = self.get_plugin.return_value
+        self.client = clients.LocalNeutronClient(self.http)
+
+    def test_bgpvpns_are_called_in_process(self):
+        self.plugin.get_bgpvpn.return_value = {'id': 'a'}
+        self.plugin.get_bgpvpns.return_value = [{'id': 'a'}]
+        self.plugin.update_bgpvpn.return_value = {'id': 'a'}
+        self.assertEqual({'bgpvpn': {'id': 'a'}},
+                         self.client.show_bgpvpn('a'))
+        self.assertEqual({'bgpvpns': [{'id': 'a'}]},
+                         self.client.list_bgpvpns(id=['a', 'b']))
+        self.assertEqual({'id': ['a', 'b']},
+                         self.plugin.get_bgpvpns.call_args[1]['filters'])
+        body = {'bgpvpn': {'import_targets': ['5000:1']}}
+        self.client.update_bgpvpn('a', body=body)
+        self.plugin.update_bgpvpn.assert_called_once_with(
+            mock.ANY, 'a', body)
+        self.assertFalse(self.http.show_bgpvpn.called)
+        # other calls are sent to the API
+        self.client.put('/path', body={})
+        self.http.put.assert_called_once_with('/path', body={})
+
+    def test_not_found(self):
+        self.plugin.get_bgpvpn.side_effect = n_exc.NotFound()
+        self.assertRaises(n_client_exc.NotFound,
+                          self.client.show_bgpvpn, 'a')
+
+    def test_api_is_used_without_plugin(self):
+        self.get_plugin.return_value = None
+        self.client.show_bgpvpn('a')
+        self.http.show_bgpvpn.assert_called_once_with('a')
+
+    def test_used_for_local_region_only(self):
+        mock.patch.object(clients, 'KeystoneSession').start()
+        mock.patch.object(clients, '_password_auth').start()
+        mock.patch.object(clients, '_neutron_client').start()
+        mock.patch.object(clients, '_keystone_client').start()
+        opts.register_interconnection_options(cfg.CONF)
+        cfg.CONF.set_override('region_name', 'RegionOne', 'interconnection')
+        mngr = clients.ClientManager(cfg.CONF.interconnection)
+        self.assertIsInstance(mngr.get_clients('RegionOne')[0],
+                              clients.LocalNeutronClient)
+        self.assertNotIsInstance(mngr.get_clients('RegionTwo')[0],
+                                 clients.LocalNeutronClient)
@@ -0,0 +1,112 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+from unittest import mock
+
+from neutron.tests import base
+
+from networking_interconnection.common import metrics
+
+
+class FakeProjects(object):
+
+    def get(self, project_id):
+        return project_id
+
+
+class FakeClient(object):
+    endpoint = 'https://example'
+
+    def __init__(self):
+        self.projects = FakeProjects()
+
+    def show_bgpvpn(self, bgpvpn_id):
+        if bgpvpn_id is None:
+            raise ValueError()
+        return bgpvpn_id
+
+
+class TestInstrumentedClient(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestInstrumentedClient, self).setUp()
+        self.registry = metrics.Registry()
+        self.client = metrics.InstrumentedClient(
+            FakeClient(), 'RegionTwo', self.registry, nested=('projects',))
+
+    def test_calls_are_measured(self):
+        self.assertEqual('id', self.client.show_bgpvpn('id'))
+        self.assertRaises(ValueError, self.client.show_bgpvpn, None)
+        self.assertEqual('p', self.client.projects.get('p'))
+        self.assertEqual('https://example', self.client.endpoint)
+        histogram = self.registry.get('RegionTwo', 'show_bgpvpn')
+        self.assertEqual(2, histogram.count)
+        self.assertEqual(1, histogram.errors)
+        self.assertEqual(1, self.registry.get('RegionTwo',
+                                              'projects.get').count)
+        self.assertIsNone(self.registry.get('RegionTwo', 'endpoint'))
+
+    def test_to_prometheus(self):
+        self.registry.observe('RegionTwo', 'show_bgpvpn', 0.02)
+        self.registry.observe('RegionTwo', 'show_bgpvpn', 20, error=True)
+        text = self.registry.to_prometheus()
+        labels = 'region="RegionTwo",operation="show_bgpvpn",pid="%d"' % (
+            os.getpid())
+        self.assertIn('interconnection_remote_call_seconds_bucket{%s,'
+                      'le="0.01"} 0\n' % labels, text)
+        self.assertIn('interconnection_remote_call_seconds_bucket{%s,'
+                      'le="0.025"} 1\n' % labels, text)
+        self.assertIn('interconnection_remote_call_seconds_bucket{%s,'
+                      'le="+Inf"} 2\n' % labels, text)
+        self.assertIn('interconnection_remote_call_seconds_count{%s} 2\n'
+                      % labels, text)
+        self.assertIn('interconnection_remote_call_errors_total{%s} 1\n'
+                      % labels, text)
+
+    def test_statsd(self):
+        with mock.patch('socket.socket') as sock:
+            registry = metrics.Registry(statsd_host='127.0.0.1')
+            registry.observe('RegionTwo', 'put', 0.5, error=True)
+        sock.return_value.sendto.assert_called_once_with(
+            b'interconnection_remote_call.RegionTwo.put:500|ms\n'
+            b'interconnection_remote_call.RegionTwo.put.errors:1|c',
+            ('127.0.0.1', 8125))
+
+    def test_write_file(self):
+        metrics_dir = self.get_new_temp_dir().path
+        # a file of a process which is not running anymore
+        stale = os.path.join(metrics_dir, 'interconnection-123.prom')
+        open(stale, 'w').close()
+        registry = metrics.Registry(metrics_dir=metrics_dir)
+        with mock.patch.object(metrics, '_is_running',
+                               side_effect=lambda pid: pid != 123):
+            registry.observe('RegionTwo', 'put', 0.5)
+        path = os.path.join(metrics_dir,
+                            'interconnection-%d.prom' % os.getpid())
+        with open(path) as f:
+            self.assertEqual(registry.to_prometheus(), f.read())
+        self.assertFalse(os.path.exists(stale))
+        registry._remove_file()
+        self.assertEqual([], os.listdir(metrics_dir))
+
+    def test_forked_process_has_own_histograms(self):
+        self.registry.observe('RegionTwo', 'put', 0.5)
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNone(self.registry.get('RegionTwo', 'put'))
+            self.registry.observe('RegionTwo', 'put', 0.5)
+            self.assertEqual(1, self.registry.get('RegionTwo', 'put').count)
+            self.assertIn('pid="%d"' % os.getpid(),
+                          self.registry.to_prometheus())
@@ -0,0 +1,141 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+import eventlet
+from neutron.tests import base
+from oslo_context import context as o_context
+
+from networking_interconnection.common import utils
+
+
+class TestRunConcurrently(base.BaseTestCase):
+
+    def test_results_in_order_of_calls(self):
+        def slow(value, delay):
+            eventlet.sleep(delay)
+            return value
+
+        self.assertEqual(
+            ['a', 'b', 'c'],
+            utils.run_concurrently(
+                3, [(slow, 'a', 0.02), (slow, 'b', 0), (slow, 'c', 0.01)]))
+
+    def test_all_calls_finished_before_raise(self):
+        finished = []
+
+        def fail(exc):
+            raise exc
+
+        def succeed():
+            eventlet.sleep(0.01)
+            finished.append(True)
+
+        self.assertRaises(
+            KeyError, utils.run_concurrently, 2,
+            [(succeed,), (fail, KeyError()), (fail, ValueError())])
+        self.assertEqual([True], finished)
+
+    def test_calls_see_request_context(self):
+        # the context of the test thread is restored afterwards
+        mock.patch.object(o_context._request_store, 'context', None,
+                          create=True).start()
+        context = o_context.RequestContext()
+        context.update_store()
+
+        def current():
+            return o_context.get_current()
+
+        with mock.patch.object(context, 'update_store',
+                               wraps=context.update_store) as update_store:
+            self.assertEqual(
+                [context, context],
+                utils.run_concurrently(2, [(current,), (current,)]))
+        self.assertEqual(2, update_store.call_count)
+
+
+class TestCircuitBreaker(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        self.now = 100.0
+        mock.patch('time.monotonic', side_effect=lambda: self.now).start()
+        self.breaker = utils.CircuitBreaker(
+            failures=2, reset_timeout=30, max_timeout=10, min_timeout=1,
+            timeout_factor=4)
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertFalse(self.breaker.record_failure())
+        self.breaker.record_success(0.1)
+        self.assertFalse(self.breaker.record_failure())
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.record_failure())
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now += 30
+        # only one probe is allowed
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        # failed probe opens the breaker again
+        self.assertTrue(self.breaker.record_failure())
+        self.assertFalse(self.breaker.allow())
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success(0.1)
+        self.assertEqual(utils.CircuitBreaker.CLOSED, self.breaker.state)
+        self.assertTrue(self.breaker.allow())
+
+    def test_adaptive_timeout(self):
+        self.assertEqual(10, self.breaker.timeout)
+        self.breaker.record_success(0.1)
+        self.assertEqual(1, self.breaker.timeout)
+        self.breaker.record_success(5)
+        self.assertAlmostEqual(4.32, self.breaker.timeout)
+        self.breaker.record_success(30)
+        self.assertEqual(10, self.breaker.timeout)
+
+
+class TestRetry(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRetry, self).setUp()
+        self.sleep = mock.patch('time.sleep').start()
+
+    def test_backoff(self):
+        for attempt, delay in ((1, 1), (2, 2), (3, 4), (6, 10)):
+            value = utils.backoff(attempt, 1, 10)
+            self.assertGreaterEqual(value, delay / 2.0)
+            self.assertLessEqual(value, delay)
+
+    def test_retryable_errors_are_retried(self):
+        func = mock.Mock(side_effect=[KeyError(), KeyError(), 'ok'])
+        self.assertEqual('ok', utils.retry(
+            func, 3, 1, 10, lambda err: isinstance(err, KeyError))('a'))
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(2, self.sleep.call_count)
+
+    def test_other_errors_and_last_attempt_are_raised(self):
+        func = mock.Mock(side_effect=ValueError())
+        self.assertRaises(ValueError, utils.retry(
+            func, 3, 1, 10, lambda err: isinstance(err, KeyError)))
+        self.assertEqual(1, func.call_count)
+        func = mock.Mock(side_effect=KeyError())
+        self.assertRaises(KeyError, utils.retry(
+            func, 2, 1, 10, lambda err: isinstance(err, KeyError)))
+        self.assertEqual(2, func.call_count)
@@ -0,0 +1,52 @@
+# Copyright (c) 2021 Cloudification GmbH
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from neutron.tests import base
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
+
+from networking_interconnection.db import interconnaction_db as intc_db
+
+
+class TestJSONEncodedDict(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestJSONEncodedDict, self).setUp()
+        self.type = intc_db.JSONEncodedDict()
+        self.value = {'project_id': ['a' * 36] * 20}
+
+    def test_text(self):
+        for dialect in (mysql.dialect(), postgresql.dialect(),
+                        sqlite.dialect()):
+            self.assertIsInstance(
+                self.type.load_dialect_impl(dialect), sa.Text)
+            value = self.type.process_bind_param(self.value, dialect)
+            self.assertIsInstance(value, str)
+            self.assertGreater(len(value), 500)
+            self.assertEqual(
+                self.value, self.type.process_result_value(value, dialect))
+            self.assertIsNone(self.type.process_bind_param(None, dialect))
+            self.assertIsNone(self.type.process_result_value(None, dialect))
+
+    def test_text_without_orjson(self):
+        dialect = sqlite.dialect()
+        with mock.patch.object(intc_db, 'orjson', None):
+            value = self.type.process_bind_param(self.value, dialect)
+            self.assertEqual(
+                self.value, self.type.process_result_value(value, dialect))
@@ -15,12 +15,17 @@
 
 import contextlib
 import copy
+import datetime
 import unittest
 from unittest import mock
+import urllib
 import webob.exc
 
+from neutron_lib.callbacks import events
+from neutron_lib import context
 from neutron_lib.plugins import directory
 from oslo_config import cfg
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 from keystoneauth1.exceptions import http as k_exc
@@ -94,11 +99,13 @@ class BaseTestCaseMixin(test_db_base_plugin_v2.NeutronDbPluginV2TestCase,
         self.nc_local.put.side_effect = self._mocked_put
         self.nc_local.show_bgpvpn.side_effect = self._mocked_show_bgpvpn
         self.nc_local.update_bgpvpn.side_effect = self._mocked_update_bgpvpn
+        self.nc_local.list_bgpvpns.side_effect = self._mocked_list_bgpvpns
         self.nc_remote = mock.Mock()
         self.nc_remote.get.side_effect = self._mocked_get
         self.nc_remote.put.side_effect = self._mocked_put
         self.nc_remote.show_bgpvpn.side_effect = self._mocked_show_bgpvpn
         self.nc_remote.update_bgpvpn.side_effect = self._mocked_update_bgpvpn
+        self.nc_remote.list_bgpvpns.side_effect = self._mocked_list_bgpvpns
 
         # we need to provide a plugin instance, although
         # the extension manager will create a new instance
@@ -118,6 +125,14 @@ class BaseTestCaseMixin(test_db_base_plugin_v2.NeutronDbPluginV2TestCase,
         # extension manager:
         self.intcn_plugin = directory.get_plugin(bgpvpn_def.ALIAS)
 
+        # execute synchronization inside API requests, there are no workers
+        cfg.CONF.set_override('sync_workers', 0, 'interconnection')
+        cfg.CONF.set_override(
+            'sync_call_retry_interval', 0, 'interconnection')
+        # both regions are served by the same plugin here, domain names
+        # cached by one side must not be seen by the other one
+        cfg.CONF.set_override('domain_cache_ttl', 0, 'interconnection')
+
         self.bgpvpn_data = {
             'bgpvpn': {
                 'name': 'test',
@@ -144,6 +159,7 @@ class BaseTestCaseMixin(test_db_base_plugin_v2.NeutronDbPluginV2TestCase,
         mock_obj.put.side_effect = self._mocked_put
         mock_obj.show_bgpvpn.side_effect = self._mocked_show_bgpvpn
         mock_obj.update_bgpvpn.side_effect = self._mocked_update_bgpvpn
+        mock_obj.list_bgpvpns.side_effect = self._mocked_list_bgpvpns
         return mock_obj
 
     def _mocked_get(self, path):
@@ -163,12 +179,31 @@ class BaseTestCaseMixin(test_db_base_plugin_v2.NeutronDbPluginV2TestCase,
         if res.status_int >= 400:
             raise http_client_error(req, res)
 
+    def _fail_first(self, method, errors):
+        """Raise errors from the first calls of a mocked method."""
+        errors = list(errors)
+        side_effect = method.side_effect
+
+        def call(*args, **kwargs):
+            if errors:
+                raise errors.pop(0)
+            return side_effect(*args, **kwargs)
+        return call
+
     def _mocked_show_bgpvpn(self, bgpvpn_id):
         return self._mocked_get('/bgpvpn/bgpvpns/%s' % bgpvpn_id)
 
     def _mocked_update_bgpvpn(self, bgpvpn_id, body):
         return self._mocked_put('/bgpvpn/bgpvpns/%s' % bgpvpn_id, body)
 
+    def _mocked_list_bgpvpns(self, **params):
+        req = self.new_list_request(
+            'bgpvpn/bgpvpns', params=urllib.parse.urlencode(params, True))
+        res = req.get_response(self.ext_api)
+        if res.status_int >= 400:
+            raise http_client_error(req, res)
+        return self.deserialize('json', res)
+
     @contextlib.contextmanager
     def bgpvpn(self, do_delete=True, **kwargs):
         req_data = copy.deepcopy(self.bgpvpn_data)
@@ -209,6 +244,25 @@ class BaseTestCaseMixin(test_db_base_plugin_v2.NeutronDbPluginV2TestCase,
             self._delete('interconnection/interconnections',
                          interconnection['interconnection']['id'])
 
+    def connect(self, local, remote):
+        """Create both sides of an interconnection, return their IDs."""
+        cfg.CONF.set_override('region_name', 'RegionOne', 'interconnection')
+        with self.intcnt(do_delete=False,
+                         tenant_id=local['tenant_id'],
+                         local_resource_id=local['id'],
+                         remote_resource_id=remote['id'],
+                         remote_region='RegionTwo') as intcn_1:
+            pass
+        cfg.CONF.set_override('region_name', 'RegionTwo', 'interconnection')
+        with self.intcnt(do_delete=False,
+                         tenant_id=remote['tenant_id'],
+                         local_resource_id=remote['id'],
+                         remote_resource_id=local['id'],
+                         remote_region='RegionOne',
+                         remote_interconnection_id=intcn_1['id']) as intcn_2:
+            pass
+        return intcn_1['id'], intcn_2['id']
+
     def list(self, resource):
         req = self.new_list_request('%s/%ss' % (resource, resource))
         res = req.get_response(self.ext_api)
@@ -256,6 +310,633 @@ class TestInterconnectionPlugin(BaseTestCaseMixin):
             for el in self.list('bgpvpn'):
                 self.assertEqual(1, len(el['import_targets']))
 
+    def test_create_and_delete_interconnections_with_sync_workers(self):
+        cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            with self.intcnt(tenant_id=self.tenant_id_1,
+                             local_resource_id=bgpvpn_1['id'],
+                             remote_resource_id=bgpvpn_2['id'],
+                             remote_region='RegionTwo') as intcn_1:
+                cfg.CONF.set_override(
+                    'region_name', 'RegionTwo', 'interconnection')
+                with self.intcnt(tenant_id=self.tenant_id_2,
+                                 local_resource_id=bgpvpn_2['id'],
+                                 remote_resource_id=bgpvpn_1['id'],
+                                 remote_region='RegionOne',
+                                 remote_interconnection_id=intcn_1['id']):
+                    # API returned before synchronization, the first side
+                    # isn't changed until the second one is paired with it
+                    self.assertEqual(
+                        sorted([constants.STATE_VALIDATING,
+                                constants.STATE_WAITING]),
+                        sorted(el['state'] for el in
+                               self.list('interconnection')))
+                    # first run pairs and sets both sides to VALIDATED,
+                    # second one synchronizes targets
+                    self.assertEqual(1, intcn_plugin.process_sync_jobs())
+                    self.assertEqual(2, intcn_plugin.process_sync_jobs())
+                    self.assertEqual(0, intcn_plugin.process_sync_jobs())
+                    for el in self.list('interconnection'):
+                        self.assertEqual(el['state'], constants.STATE_ACTIVE)
+                    for el in self.list('bgpvpn'):
+                        self.assertEqual(sorted(['6000:1', '5000:1']),
+                                         sorted(el['import_targets']))
+                self.assertEqual(1, intcn_plugin.process_sync_jobs())
+            self.assertEqual(1, intcn_plugin.process_sync_jobs())
+            for el in self.list('bgpvpn'):
+                self.assertEqual(1, len(el['import_targets']))
+
+    def test_handshake_calls(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            intcn_1, intcn_2 = self.connect(bgpvpn_1, bgpvpn_2)
+            # the first side is paired and validated by one call, the
+            # second side isn't updated via its own API
+            self.nc_remote.put.assert_called_once_with(
+                mock.ANY, body={'interconnection': {
+                    'state': constants.STATE_VALIDATED,
+                    'remote_interconnection_id': intcn_2}})
+            self.assertIn(intcn_1, self.nc_remote.put.call_args[0][0])
+            self.assertFalse(self.nc_local.put.called)
+            for el in self.list('interconnection'):
+                self.assertEqual(constants.STATE_ACTIVE, el['state'])
+
+    def test_export_targets_change_is_pushed_to_peer(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            self.nc_remote.put.reset_mock()
+            # the second side is local now
+            self._update('bgpvpn/bgpvpns', bgpvpn_2['id'],
+                         {'bgpvpn': {'export_targets': ['6000:2']}})
+            self.nc_remote.put.assert_called_once_with(
+                mock.ANY, body={'interconnection': {
+                    'state': constants.STATE_VALIDATED}})
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1', '6000:2'],
+                             sorted(bgpvpn['import_targets']))
+            for el in self.list('interconnection'):
+                self.assertEqual(constants.STATE_ACTIVE, el['state'])
+            # other changes are not pushed
+            self._update('bgpvpn/bgpvpns', bgpvpn_2['id'],
+                         {'bgpvpn': {'name': 'renamed'}})
+            self.nc_remote.put.assert_called_once()
+
+    def test_export_targets_change_with_raw_request_body(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            self.nc_remote.put.reset_mock()
+            new = dict(bgpvpn_2, export_targets=['6000:2'])
+            # like the pecan API, without export targets of the original
+            old = {'id': bgpvpn_2['id']}
+
+            def publish(body):
+                intcn_plugin._bgpvpn_updated(
+                    constants.BGPVPN_RESOURCE, events.BEFORE_RESPONSE, None,
+                    events.APIEventPayload(
+                        context.get_admin_context(), 'bgpvpn.update.end',
+                        'update_bgpvpn', request_body=body,
+                        states=(old, {'bgpvpn': new})))
+
+            publish(b'{"bgpvpn": {"name": "renamed"}}')
+            publish('{"bgpvpn": {"import_targets": ["7000:1"]}}')
+            self.assertFalse(self.nc_remote.put.called)
+            publish(b'{"bgpvpn": {"export_targets": ["6000:2"]}}')
+            self.nc_remote.put.assert_called_once_with(
+                mock.ANY, body={'interconnection': {
+                    'state': constants.STATE_VALIDATED}})
+            # a body which can't be decoded counts as a change
+            self.nc_remote.put.reset_mock()
+            publish(b'not json')
+            self.nc_remote.put.assert_called_once()
+            # the original export targets are compared if they are known
+            self.nc_remote.put.reset_mock()
+            old = bgpvpn_2
+            publish(b'{"bgpvpn": {"export_targets": ["6000:2"]}}')
+            self.nc_remote.put.assert_called_once()
+            old = new
+            publish(b'{"bgpvpn": {"export_targets": ["6000:2"]}}')
+            self.nc_remote.put.assert_called_once()
+
+    def test_sync_job_written_with_interconnection(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            intcn_1, _ = self.connect(bgpvpn_1, bgpvpn_2)
+            with mock.patch.object(intcn_plugin.db, 'create_sync_job',
+                                   side_effect=ValueError()):
+                self.assertRaises(
+                    ValueError, intcn_plugin.delete_interconnection,
+                    context.get_admin_context(), intcn_1)
+            # the interconnection isn't deleted without its sync job
+            self.assertEqual(2, len(self.list('interconnection')))
+
+    def test_sync_jobs_ordered_per_interconnection(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        ctx = context.get_admin_context()
+        intcn_1, intcn_2 = (
+            {'id': _uuid(), 'local_resource_id': _uuid()} for _ in range(2))
+        first = intcn_plugin.db.create_sync_job(
+            ctx, 'after_update', intcn_1)
+        second = intcn_plugin.db.create_sync_job(
+            ctx, 'after_delete', intcn_1)
+        other = intcn_plugin.db.create_sync_job(ctx, 'after_update', intcn_2)
+        self.assertEqual([first['id'], other['id']],
+                         [job['id'] for job in
+                          intcn_plugin.db.get_sync_jobs(ctx)])
+        intcn_plugin.db.delete_sync_job(ctx, first['id'])
+        self.assertEqual([second['id'], other['id']],
+                         [job['id'] for job in
+                          intcn_plugin.db.get_sync_jobs(ctx)])
+
+    def test_sync_job_retried(self):
+        cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+        cfg.CONF.set_override('sync_retry_interval', 0, 'interconnection')
+        cfg.CONF.set_override('sync_max_attempts', 2, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            with self.intcnt(tenant_id=self.tenant_id_1,
+                             local_resource_id=bgpvpn_1['id'],
+                             remote_resource_id=bgpvpn_2['id'],
+                             remote_region='RegionTwo') as intcn_1:
+                cfg.CONF.set_override(
+                    'region_name', 'RegionTwo', 'interconnection')
+                with self.intcnt(tenant_id=self.tenant_id_2,
+                                 local_resource_id=bgpvpn_2['id'],
+                                 remote_resource_id=bgpvpn_1['id'],
+                                 remote_region='RegionOne',
+                                 remote_interconnection_id=intcn_1['id']):
+                    self.nc_remote.put.side_effect = \
+                        n_client_exc.NeutronClientException('some-problem')
+                    self.assertEqual(1, intcn_plugin.process_sync_jobs())
+                    self.assertEqual(
+                        sorted([constants.STATE_VALIDATING,
+                                constants.STATE_WAITING]),
+                        sorted(el['state'] for el in
+                               self.list('interconnection')))
+                    # the last attempt fails as well
+                    self.assertEqual(1, intcn_plugin.process_sync_jobs())
+                    self.assertEqual(0, intcn_plugin.process_sync_jobs())
+                    self.assertIn(
+                        constants.STATE_TEARDOWN,
+                        [el['state'] for el in self.list('interconnection')])
+                    self.nc_remote.put.side_effect = self._mocked_put
+
+    def test_sync_job_of_deleted_interconnection_dropped(self):
+        cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+        cfg.CONF.set_override('sync_retry_interval', 0, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        ctx = context.get_admin_context()
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            intcn_plugin.db.create_sync_job(ctx, 'after_update', {
+                'id': _uuid(), 'local_resource_id': bgpvpn_1['id'],
+                'remote_resource_id': bgpvpn_2['id'],
+                'remote_region': 'RegionTwo'})
+            self.assertEqual(1, intcn_plugin.process_sync_jobs())
+            # not retried and targets of the remote side are not added
+            self.assertEqual([], intcn_plugin.db.get_sync_jobs(ctx))
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1'], bgpvpn['import_targets'])
+
+    def test_sync_call_retried_on_transient_error(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.nc_remote.put.side_effect = self._fail_first(
+                self.nc_remote.put, [n_client_exc.ServiceUnavailable('busy'),
+                                     n_client_exc.Conflict('conflict')])
+            self.connect(bgpvpn_1, bgpvpn_2)
+            for el in self.list('interconnection'):
+                self.assertEqual(constants.STATE_ACTIVE, el['state'])
+
+    def test_sync_job_not_retried_on_permanent_error(self):
+        cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            self.nc_remote.put.reset_mock()
+            self.nc_remote.put.side_effect = n_client_exc.Forbidden()
+            self.assertEqual(1, intcn_plugin.process_sync_jobs())
+            # forbidden call is not repeated
+            self.assertEqual(1, self.nc_remote.put.call_count)
+            self.assertEqual(0, intcn_plugin.process_sync_jobs())
+            self.assertIn(
+                constants.STATE_TEARDOWN,
+                [el['state'] for el in self.list('interconnection')])
+            self.nc_remote.put.side_effect = self._mocked_put
+
+    def test_failed_export_targets_push_keeps_interconnection(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+            self.nc_remote.put.side_effect = n_client_exc.Forbidden()
+            self._update('bgpvpn/bgpvpns', bgpvpn_2['id'],
+                         {'bgpvpn': {'export_targets': ['6000:2']}})
+            self.assertEqual(1, intcn_plugin.process_sync_jobs())
+            # the job is dropped without teardown
+            self.assertEqual(0, intcn_plugin.process_sync_jobs())
+            for el in self.list('interconnection'):
+                self.assertEqual(constants.STATE_ACTIVE, el['state'])
+            self.nc_remote.put.side_effect = self._mocked_put
+
+    def test_get_workers(self):
+        cfg.CONF.set_override('reconcile_interval', 0, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        self.assertEqual([], intcn_plugin.get_workers())
+        cfg.CONF.set_override('sync_workers', 2, 'interconnection')
+        workers = intcn_plugin.get_workers()
+        self.assertEqual(1, len(workers))
+        self.assertEqual(2, workers[0].worker_process_count)
+        cfg.CONF.set_override('reconcile_interval', 60, 'interconnection')
+        workers = intcn_plugin.get_workers()
+        self.assertEqual(2, len(workers))
+        self.assertEqual(1, workers[1].worker_process_count)
+
+    def test__get_bgpvpns_in_chunks(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        ids = [_uuid() for _ in range(constants.BGPVPN_IDS_PER_REQUEST + 1)]
+        nc = mock.Mock()
+        nc.list_bgpvpns.side_effect = lambda id: {
+            'bgpvpns': [{'id': i} for i in id if i != ids[0]]}
+        found, not_found = intcn_plugin._get_bgpvpns(nc, ids + ids[:3])
+        self.assertEqual(2, nc.list_bgpvpns.call_count)
+        self.assertEqual(set(ids[1:]), set(found))
+        self.assertEqual({ids[0]}, not_found)
+
+    def test_reconcile_interconnections(self):
+        cfg.CONF.set_override('reconcile_batch_size', 1, 'interconnection')
+        cfg.CONF.set_override('reconcile_region_rate', 0, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            with self.intcnt(tenant_id=self.tenant_id_1,
+                             local_resource_id=bgpvpn_1['id'],
+                             remote_resource_id=bgpvpn_2['id'],
+                             remote_region='RegionTwo') as intcn_1:
+                cfg.CONF.set_override(
+                    'region_name', 'RegionTwo', 'interconnection')
+                with self.intcnt(tenant_id=self.tenant_id_2,
+                                 local_resource_id=bgpvpn_2['id'],
+                                 remote_resource_id=bgpvpn_1['id'],
+                                 remote_region='RegionOne',
+                                 remote_interconnection_id=intcn_1['id']):
+                    # somebody removed the remote target on both sides
+                    for bgpvpn in (bgpvpn_1, bgpvpn_2):
+                        self._mocked_update_bgpvpn(
+                            bgpvpn['id'],
+                            {'bgpvpn': {'import_targets': bgpvpn[
+                                'import_targets']}})
+                    self.nc_local.update_bgpvpn.reset_mock()
+                    # one interconnection is checked per run
+                    for _ in range(2):
+                        intcn_plugin.reconcile_interconnections()
+                    self.assertEqual(
+                        2, self.nc_local.update_bgpvpn.call_count)
+                    for el in self.list('bgpvpn'):
+                        self.assertEqual(sorted(['6000:1', '5000:1']),
+                                         sorted(el['import_targets']))
+                    # nothing is updated when there is no drift
+                    intcn_plugin.reconcile_interconnections()
+                    intcn_plugin.reconcile_interconnections()
+                    self.assertEqual(
+                        2, self.nc_local.update_bgpvpn.call_count)
+
+    def test_reconcile_removes_unneeded_targets(self):
+        cfg.CONF.set_override('reconcile_region_rate', 0, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        ctx = context.get_admin_context()
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            intcn_1, _ = self.connect(bgpvpn_1, bgpvpn_2)
+            cfg.CONF.set_override(
+                'region_name', 'RegionOne', 'interconnection')
+            # the remote resource stopped exporting 6000:2 and the sync
+            # job of a deleted interconnection failed
+            orphan = _uuid()
+            intcn_plugin.db.set_route_targets(
+                ctx, intcn_1, bgpvpn_1['id'], ['6000:1', '6000:2'])
+            intcn_plugin.db.set_route_targets(
+                ctx, orphan, bgpvpn_1['id'], ['9000:1'])
+            self._mocked_update_bgpvpn(bgpvpn_1['id'], {'bgpvpn': {
+                'import_targets': ['5000:1', '6000:1', '6000:2', '9000:1',
+                                   '9999:1']}})
+            intcn_plugin.reconcile_interconnections()
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            # targets which were not added by interconnections stay
+            self.assertEqual(['5000:1', '6000:1', '9999:1'],
+                             sorted(bgpvpn['import_targets']))
+            self.assertEqual(
+                {intcn_1: {'6000:1'}},
+                intcn_plugin.db.get_route_targets(ctx, bgpvpn_1['id']))
+            # the position is kept in the database
+            cfg.CONF.set_override('reconcile_batch_size', 1, 'interconnection')
+            intcn_plugin.reconcile_interconnections()
+            self.assertIsNotNone(intcn_plugin.db.get_reconcile_cursor(
+                ctx, plugin.RECONCILE_CURSOR))
+
+    def test_delete_keeps_targets_of_other_interconnections(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2, \
+                self.bgpvpn(export_targets=['6000:1', '7000:1'],
+                            import_targets=['7000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_3:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            intcn_id, _ = self.connect(bgpvpn_1, bgpvpn_3)
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1', '6000:1', '7000:1'],
+                             sorted(bgpvpn['import_targets']))
+            cfg.CONF.set_override(
+                'region_name', 'RegionOne', 'interconnection')
+            self.nc_remote.show_bgpvpn.reset_mock()
+            self._delete('interconnection/interconnections', intcn_id)
+            # 6000:1 is still needed by interconnection with bgpvpn_2
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1', '6000:1'],
+                             sorted(bgpvpn['import_targets']))
+            self.assertFalse(self.nc_remote.show_bgpvpn.called)
+
+    def test_sync_jobs_of_bgpvpn_update_it_once(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2, \
+                self.bgpvpn(export_targets=['6000:1', '7000:1'],
+                            import_targets=['7000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_3:
+            intcn_1, _ = self.connect(bgpvpn_1, bgpvpn_2)
+            intcn_2, _ = self.connect(bgpvpn_1, bgpvpn_3)
+            cfg.CONF.set_override('sync_workers', 1, 'interconnection')
+            cfg.CONF.set_override(
+                'region_name', 'RegionOne', 'interconnection')
+            self._delete('interconnection/interconnections', intcn_1)
+            self._delete('interconnection/interconnections', intcn_2)
+            self.nc_local.update_bgpvpn.reset_mock()
+            self.assertEqual(2, intcn_plugin.process_sync_jobs())
+            # 6000:1 was needed by both deleted interconnections
+            self.nc_local.update_bgpvpn.assert_called_once_with(
+                bgpvpn_1['id'], body=mock.ANY)
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1'], bgpvpn['import_targets'])
+            self.assertEqual({}, intcn_plugin.db.get_route_targets(
+                context.get_admin_context(), bgpvpn_1['id']))
+
+    def test_sync_jobs_lock_bgpvpn(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        calls = []
+
+        def record(name, func):
+            def call(ctx, *args, **kwargs):
+                calls.append((name, args[0]))
+                return func(ctx, *args, **kwargs)
+            return call
+
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            cfg.CONF.set_override(
+                'region_name', 'RegionOne', 'interconnection')
+            for name in ('lock_bgpvpn', 'get_route_targets'):
+                mock.patch.object(intcn_plugin.db, name, record(
+                    name, getattr(intcn_plugin.db, name))).start()
+            self._delete('interconnection/interconnections',
+                         self.list('interconnection')[0]['id'])
+            # tracked targets are read again after the BGPVPN was locked
+            bgpvpn_id = calls[0][1]
+            self.assertEqual([('get_route_targets', bgpvpn_id),
+                              ('lock_bgpvpn', bgpvpn_id),
+                              ('get_route_targets', bgpvpn_id)], calls)
+            # the lock is created once
+            intcn_plugin.db.create_bgpvpn_lock(
+                context.get_admin_context(), bgpvpn_id)
+
+    def test_delete_interconnection_bulk(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2, \
+                self.bgpvpn(export_targets=['7000:1'],
+                            import_targets=['7000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_3:
+            intcn_1, _ = self.connect(bgpvpn_1, bgpvpn_2)
+            intcn_2, _ = self.connect(bgpvpn_1, bgpvpn_3)
+            cfg.CONF.set_override(
+                'region_name', 'RegionOne', 'interconnection')
+            self.nc_local.update_bgpvpn.reset_mock()
+            self.assertRaises(
+                intc_exc.NotFound, intcn_plugin.delete_interconnection_bulk,
+                context.get_admin_context(), [intcn_1, _uuid()])
+            self.assertEqual(4, len(self.list('interconnection')))
+            deleted = intcn_plugin.delete_interconnection_bulk(
+                context.get_admin_context(), [intcn_1, intcn_2])
+            self.assertEqual({intcn_1, intcn_2},
+                             {el['id'] for el in deleted})
+            self.assertEqual(2, len(self.list('interconnection')))
+            # targets of both interconnections are removed by one update
+            self.nc_local.update_bgpvpn.assert_called_once_with(
+                bgpvpn_1['id'], body=mock.ANY)
+            bgpvpn = self._mocked_show_bgpvpn(bgpvpn_1['id'])['bgpvpn']
+            self.assertEqual(['5000:1'], bgpvpn['import_targets'])
+            self.assertEqual(
+                [], intcn_plugin.db.get_sync_jobs(context.get_admin_context()))
+
+    def test_create_interconnection_bulk(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2, \
+                self.bgpvpn(export_targets=['7000:1'],
+                            import_targets=['7000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_3:
+            items = [
+                {'name': 'test', 'tenant_id': self.tenant_id_1,
+                 'local_resource_id': bgpvpn_1['id'],
+                 'remote_resource_id': remote['id'],
+                 'remote_region': 'RegionTwo'}
+                for remote in (bgpvpn_2, bgpvpn_3, bgpvpn_2)]
+            # duplicate in the request fails all of them
+            req = self.new_create_request(
+                'interconnection/interconnections',
+                {'interconnections': items})
+            res = req.get_response(self.ext_api)
+            self.assertEqual(409, res.status_int)
+            self.assertEqual([], self.list('interconnection'))
+            req = self.new_create_request(
+                'interconnection/interconnections',
+                {'interconnections': items[:2]})
+            res = req.get_response(self.ext_api)
+            self.assertEqual(201, res.status_int)
+            intcns = self.deserialize('json', res)['interconnections']
+            self.assertEqual([bgpvpn_2['id'], bgpvpn_3['id']],
+                             [el['remote_resource_id'] for el in intcns])
+            for el in intcns:
+                self.assertEqual(constants.STATE_WAITING, el['state'])
+                self._delete('interconnection/interconnections', el['id'])
+
+    def test_bgpvpns_are_fetched_once(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2, \
+                self.bgpvpn(export_targets=['7000:1'],
+                            import_targets=['7000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_3:
+            items = [
+                {'name': 'test', 'tenant_id': self.tenant_id_1,
+                 'local_resource_id': bgpvpn_1['id'],
+                 'remote_resource_id': remote['id'],
+                 'remote_region': 'RegionTwo'}
+                for remote in (bgpvpn_2, bgpvpn_3)]
+            req = self.new_create_request(
+                'interconnection/interconnections',
+                {'interconnections': items})
+            res = req.get_response(self.ext_api)
+            self.assertEqual(201, res.status_int)
+            # BGPVPNs of all items are fetched by one call per region
+            self.nc_local.list_bgpvpns.assert_called_once_with(
+                id=[bgpvpn_1['id']])
+            self.nc_remote.list_bgpvpns.assert_called_once_with(
+                id=sorted([bgpvpn_2['id'], bgpvpn_3['id']]))
+            self.assertFalse(self.nc_local.show_bgpvpn.called)
+            self.assertFalse(self.nc_remote.show_bgpvpn.called)
+            # older revision doesn't replace the cached one
+            newer = dict(bgpvpn_2, revision_number=5, name='newer')
+            intcn_plugin._cache_bgpvpn('RegionTwo', newer)
+            intcn_plugin._cache_bgpvpn(
+                'RegionTwo', dict(bgpvpn_2, revision_number=4))
+            self.assertEqual(newer, intcn_plugin._get_cached_bgpvpn(
+                'RegionTwo', bgpvpn_2['id']))
+            for el in self.deserialize('json', res)['interconnections']:
+                self._delete('interconnection/interconnections', el['id'])
+
+    def test_activation_times(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            intcn_1, _ = self.connect(bgpvpn_1, bgpvpn_2)
+            transitions = intcn_plugin.db.get_state_transitions(
+                context.get_admin_context(), intcn_1)
+            self.assertEqual(
+                [(None, constants.STATE_WAITING),
+                 (constants.STATE_WAITING, constants.STATE_VALIDATED),
+                 (constants.STATE_VALIDATED, constants.STATE_ACTIVE)],
+                [(el['old_state'], el['new_state']) for el in transitions])
+            self.assertIsNone(transitions[0]['duration'])
+            for el in transitions[1:]:
+                self.assertGreaterEqual(el['duration'], 0)
+            req = self.new_list_request('interconnection/activation_times')
+            times = self.deserialize(
+                'json', req.get_response(self.ext_api))['activation_times']
+            self.assertEqual(['RegionOne', 'RegionTwo'],
+                             [el['remote_region'] for el in times])
+            for el in times:
+                self.assertEqual(1, el['count'])
+                self.assertGreaterEqual(el['p95'], el['p50'])
+            self.assertRaises(
+                intc_exc.ActivationTimeNotFound,
+                intcn_plugin.get_activation_time,
+                context.get_admin_context(), 'RegionThree')
+            # regions are paginated
+            page = intcn_plugin.get_activation_times(
+                context.get_admin_context(), limit=1, marker='RegionOne')
+            self.assertEqual(['RegionTwo'],
+                             [el['remote_region'] for el in page])
+            page = intcn_plugin.get_activation_times(
+                context.get_admin_context(), limit=1, marker='RegionTwo',
+                page_reverse=True)
+            self.assertEqual(['RegionOne'],
+                             [el['remote_region'] for el in page])
+            # transitions are kept after delete
+            self._delete('interconnection/interconnections', intcn_1)
+            self.assertEqual(
+                1, intcn_plugin.get_activation_time(
+                    context.get_admin_context(), 'RegionTwo')['count'])
+            # until they are too old
+            later = timeutils.utcnow() + datetime.timedelta(days=91)
+            with mock.patch.object(plugin.timeutils, 'utcnow',
+                                   return_value=later):
+                intcn_plugin.process_sync_jobs()
+            self.assertEqual([], intcn_plugin.get_activation_times(
+                context.get_admin_context()))
+
     def test_interconnection_duplicate_failed(self):
         with self.bgpvpn(export_targets=['5000:1'],
                          import_targets=['5000:1'],
@@ -282,6 +963,80 @@ class TestInterconnectionPlugin(BaseTestCaseMixin):
                      % (bgpvpn_1['id'], bgpvpn_2['id'])),
                     str(context.exception))
 
+    def test_interconnection_duplicate_concurrent_failed(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            with self.intcnt(tenant_id=self.tenant_id_1,
+                             local_resource_id=bgpvpn_1['id'],
+                             remote_resource_id=bgpvpn_2['id'],
+                             remote_region='RegionTwo'):
+                # another request passed the check at the same time
+                with mock.patch.object(intcn_plugin.db,
+                                       'get_interconnections',
+                                       return_value=[]), \
+                        unittest.TestCase.assertRaises(
+                            self, webob.exc.HTTPClientError) as context:
+                    with self.intcnt(tenant_id=self.tenant_id_1,
+                                     local_resource_id=bgpvpn_1['id'],
+                                     remote_resource_id=bgpvpn_2['id'],
+                                     remote_region='RegionTwo'):
+                        pass
+                self.assertIn('already exist', str(context.exception))
+                self.assertEqual(1, len(self.list('interconnection')))
+
+    def test_list_with_pagination_sorting_and_fields(self):
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            ids = sorted(self.connect(bgpvpn_1, bgpvpn_2))
+            self.assertTrue(getattr(
+                directory.get_plugin(intc_exc.ALIAS),
+                '_InterconnectionPlugin__native_pagination_support'))
+
+            def _list(**params):
+                req = self.new_list_request(
+                    'interconnection/interconnections',
+                    params=urllib.parse.urlencode(params, True))
+                res = self.deserialize('json', req.get_response(self.ext_api))
+                return res['interconnections']
+
+            page = _list(limit=1, sort_key='id', sort_dir='desc')
+            self.assertEqual([ids[1]], [el['id'] for el in page])
+            page = _list(limit=1, sort_key='id', sort_dir='desc',
+                         marker=ids[1])
+            self.assertEqual([ids[0]], [el['id'] for el in page])
+            page = _list(sort_key='remote_region', sort_dir='asc',
+                         fields=['remote_region'])
+            self.assertEqual([{'remote_region': 'RegionOne'},
+                              {'remote_region': 'RegionTwo'}], page)
+
+    def test_list_does_not_make_dicts_of_models(self):
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        ctx = context.get_admin_context()
+        with self.bgpvpn(export_targets=['5000:1'],
+                         import_targets=['5000:1'],
+                         tenant_id=self.tenant_id_1) as bgpvpn_1, \
+                self.bgpvpn(export_targets=['6000:1'],
+                            import_targets=['6000:1'],
+                            tenant_id=self.tenant_id_2) as bgpvpn_2:
+            self.connect(bgpvpn_1, bgpvpn_2)
+            expected = [intcn_plugin.get_interconnection(ctx, el['id'])
+                        for el in self.list('interconnection')]
+            with mock.patch.object(intcn_plugin.db, '_make_dict') as make:
+                intcns = intcn_plugin.get_interconnections(
+                    ctx, sorts=[('id', True)])
+            self.assertFalse(make.called)
+            self.assertEqual(sorted(expected, key=lambda el: el['id']),
+                             intcns)
+
     def test__sync_resources_neutron_failed(self):
         with self.bgpvpn(export_targets=['5000:1'],
                          import_targets=['5000:1'],
@@ -366,6 +1121,44 @@ class TestInterconnectionPlugin(BaseTestCaseMixin):
                 self.assertIn(
                     'owned by different domains', str(context.exception))
 
+    def test__get_domain_name_cached(self):
+        cfg.CONF.set_override('domain_cache_ttl', 60, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        kc = mock.Mock()
+        kc.domains.get.return_value.name = 'domain'
+        for _ in range(3):
+            self.assertEqual('domain', intcn_plugin._get_domain_name(
+                'RegionTwo', kc, self.tenant_id_1))
+        self.assertEqual(1, kc.projects.get.call_count)
+        # the same project in another region is another keystone
+        intcn_plugin._get_domain_name('RegionThree', kc, self.tenant_id_1)
+        self.assertEqual(2, kc.projects.get.call_count)
+        self.assertEqual(
+            {'size': 2, 'hits': 2, 'misses': 2},
+            intcn_plugin._domain_names.stats())
+
+    def test_domain_mismatch_invalidates_involved_projects(self):
+        cfg.CONF.set_override('domain_cache_ttl', 60, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        intcn_plugin._domain_names.set(('RegionTwo', 'other'), 'domain')
+        domains = {('RegionTwo', self.tenant_id_2): 'domain',
+                   ('RegionOne', self.tenant_id_1): 'other-domain'}
+        for key, name in domains.items():
+            intcn_plugin._domain_names.set(key, name)
+        self.assertFalse(intcn_plugin._same_domain(
+            domains, *domains.keys()))
+        self.assertEqual(['domain', None, None], [
+            intcn_plugin._domain_names.get(key)
+            for key in [('RegionTwo', 'other')] + list(domains)])
+
+    def test__get_domain_name_not_cached_when_disabled(self):
+        cfg.CONF.set_override('domain_cache_ttl', 0, 'interconnection')
+        intcn_plugin = directory.get_plugin(intc_exc.ALIAS)
+        kc = mock.Mock()
+        intcn_plugin._get_domain_name('RegionTwo', kc, self.tenant_id_1)
+        intcn_plugin._get_domain_name('RegionTwo', kc, self.tenant_id_1)
+        self.assertEqual(2, kc.projects.get.call_count)
+
     def test_create_with_local_region(self):
         with self.bgpvpn(export_targets=['5000:1'],
                          import_targets=['5000:1'],